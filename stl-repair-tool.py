@@ -11,13 +11,17 @@ import datetime
 
 
 def repair_basic(mesh, verbose=False):
-    """Grundlegende Reparatur ohne fortgeschrittene Funktionen"""
+    """Grundlegende Reparatur ohne fortgeschrittene Funktionen
+
+    Das Mesh wurde bereits beim Laden verarbeitet (Vertices zusammengeführt),
+    daher werden hier nur noch doppelte Flächen entfernt.
+    """
     if verbose:
         print("Führe grundlegende Reparaturen durch...")
 
     try:
         # Entferne doppelte Flächen
-        mesh.process()
+        mesh.update_faces(mesh.unique_faces())
         if verbose:
             print("- Doppelte Flächen entfernt")
 
@@ -95,12 +99,15 @@ def repair_mesh(input_file, output_file, verbose=False, export_intermediate=Fals
             # Wenn relativer Pfad angegeben wurde
             output_file = os.path.join(output_dir, os.path.basename(output_file))
 
+        # Basisname und Endung für Zwischenergebnisse nur einmal bestimmen
+        output_base, output_ext = os.path.splitext(os.path.basename(output_file))
+
         if verbose:
             print(f"Lade Mesh aus: {input_file}")
             print(f"Ausgabe wird in {output_file} gespeichert")
 
-        # Mesh laden
-        mesh = trimesh.load(input_file)
+        # Mesh laden (trimesh führt dabei bereits process() aus)
+        mesh = trimesh.load(input_file, process=True)
 
         if verbose:
             print(f"Ursprüngliches Mesh: {len(mesh.faces)} Flächen, {len(mesh.vertices)} Vertices")
@@ -116,8 +123,7 @@ def repair_mesh(input_file, output_file, verbose=False, export_intermediate=Fals
 
         # Speichere Original-Mesh, falls gewünscht
         if export_intermediate:
-            intermediate_base, ext = os.path.splitext(os.path.basename(output_file))
-            intermediate_path = os.path.join(output_dir, f"{intermediate_base}_original{ext}")
+            intermediate_path = os.path.join(output_dir, f"{output_base}_original{output_ext}")
             mesh.export(intermediate_path)
             if verbose:
                 print(f"Original-Mesh gespeichert in: {intermediate_path}")
@@ -127,8 +133,7 @@ def repair_mesh(input_file, output_file, verbose=False, export_intermediate=Fals
 
         # Prüfe Ergebnis nach grundlegender Reparatur
         if export_intermediate:
-            intermediate_base, ext = os.path.splitext(os.path.basename(output_file))
-            intermediate_path = os.path.join(output_dir, f"{intermediate_base}_basic{ext}")
+            intermediate_path = os.path.join(output_dir, f"{output_base}_basic{output_ext}")
             repaired_mesh.export(intermediate_path)
             if verbose:
                 print(f"Mesh nach grundlegender Reparatur gespeichert in: {intermediate_path}")
@@ -4,21 +4,35 @@ Hauptklasse der STL3D-Anwendung
 
 import os
 import sys
+import importlib
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 from resources.styles import COLORS
 from utils.gui_utils import RedirectText, create_button
 from utils.file_utils import setup_drag_drop
-from ui.image_to_stl_tab import ImageToSTLTab
-from ui.contour_crafting_tab import ContourCraftingTab
-from ui.topographic_tab import TopographicTab
-from ui.stl_repair_tab import STLRepairTab
-from ui.text_to_stl_tab import TextToSTLTab
 
 # Plattformspezifische Importe
 if sys.platform == 'darwin':  # macOS
     from utils.mac_compatibility import setup_mac_drag_drop, setup_mac_menu
 
+# Tab-Module in der Reihenfolge der Notebook-Tabs: (Modul, Klasse, Attributname).
+# Die Module ziehen numpy, OpenCV, trimesh usw. nach und werden daher erst
+# importiert, wenn der jeweilige Tab zum ersten Mal angezeigt wird.
+TAB_MODULES = [
+    ("ui.image_to_stl_tab", "ImageToSTLTab", "image_to_stl"),
+    ("ui.contour_crafting_tab", "ContourCraftingTab", "contour_crafting"),
+    ("ui.topographic_tab", "TopographicTab", "topographic"),
+    ("ui.stl_repair_tab", "STLRepairTab", "stl_repair"),
+    ("ui.text_to_stl_tab", "TextToSTLTab", "text_to_stl"),
+]
+
+# Dateiendung -> Index des zuständigen Tabs (Bilder, STL-Dateien, Schriftarten)
+EXTENSION_TABS = {
+    '.jpg': 0, '.jpeg': 0, '.png': 0, '.bmp': 0, '.gif': 0, '.tiff': 0,
+    '.stl': 3,
+    '.ttf': 4, '.otf': 4, '.ttc': 4,
+}
+
 
 class STL3DApp:
     """Hauptklasse für die 3D-Modellierungsanwendung"""
@@ -54,23 +68,17 @@ class STL3DApp:
 
     def check_output_dirs(self):
         """Erstellt die benötigten Ausgabeverzeichnisse, falls sie nicht existieren"""
-        output_base = "output"
-        if not os.path.exists(output_base):
-            os.makedirs(output_base, exist_ok=True)
-
-        # Verzeichnisse für jedes Modul
-        module_dirs = [
+        # Verzeichnisse für jedes Modul; makedirs legt "output" gleich mit an
+        module_dirs = (
             "image-to-stl",
             "contour-crafting",
             "topographic-layering",
             "stl-repair",
-            "text-to-stl"  # Neues Verzeichnis für Text-zu-STL
-        ]
+            "text-to-stl",
+        )
 
         for module_dir in module_dirs:
-            dir_path = os.path.join(output_base, module_dir)
-            if not os.path.exists(dir_path):
-                os.makedirs(dir_path, exist_ok=True)
+            os.makedirs(os.path.join("output", module_dir), exist_ok=True)
 
     def apply_theme(self):
         """Wendet das Material Design-Thema auf die Anwendung an"""
@@ -164,37 +172,72 @@ class STL3DApp:
         text_to_stl_tab = ttk.Frame(self.notebook)
         self.notebook.add(text_to_stl_tab, text="Text zu STL")
 
-        # Log-Umleitung für alle Tabs
-        log_widget = None
+        self._tab_frames = [image_to_stl_tab, contour_tab, topo_tab, repair_tab, text_to_stl_tab]
+        self._redirects = [None] * len(TAB_MODULES)
+        for _, _, attr_name in TAB_MODULES:
+            setattr(self, attr_name, None)
 
-        # Initialisiere die Tab-Module
-        self.image_to_stl = ImageToSTLTab(image_to_stl_tab, self.status_var, self.log_redirect)
-        self.contour_crafting = ContourCraftingTab(contour_tab, self.status_var, self.log_redirect)
-        self.topographic = TopographicTab(topo_tab, self.status_var, self.log_redirect)
-        self.stl_repair = STLRepairTab(repair_tab, self.status_var, self.log_redirect)
-        self.text_to_stl = TextToSTLTab(text_to_stl_tab, self.status_var, self.log_redirect)  # NEU
+        # Nur der erste Tab wird sofort aufgebaut, die übrigen beim ersten Anzeigen
+        self._ensure_tab(0)
 
         # Verwende das erste Log-Widget für Umleitung
-        log_widget = self.image_to_stl.log_text
-        self.log_redirect = RedirectText(log_widget)
+        self.log_redirect = self._redirects[0]
         sys.stdout = self.log_redirect
 
         # Tab-Wechsel-Handler, um das Log-Widget zu aktualisieren
         def on_tab_change(event):
             tab_idx = self.notebook.index("current")
-            if tab_idx == 0:  # Image to STL
-                sys.stdout = RedirectText(self.image_to_stl.log_text)
-            elif tab_idx == 1:  # Contour Crafting
-                sys.stdout = RedirectText(self.contour_crafting.log_text)
-            elif tab_idx == 2:  # Topographic
-                sys.stdout = RedirectText(self.topographic.log_text)
-            elif tab_idx == 3:  # STL Repair
-                sys.stdout = RedirectText(self.stl_repair.log_text)
-            elif tab_idx == 4:  # Text to STL
-                sys.stdout = RedirectText(self.text_to_stl.log_text)
+            self._ensure_tab(tab_idx)
+            sys.stdout = self._redirects[tab_idx]
 
         self.notebook.bind("<<NotebookTabChanged>>", on_tab_change)
 
+    def _ensure_tab(self, tab_idx):
+        """
+        Baut das Tab-Modul mit dem angegebenen Index auf, falls noch nicht geschehen.
+
+        Args:
+            tab_idx: Index des Tabs im Notebook
+
+        Returns:
+            Die Instanz des Tab-Moduls
+        """
+        module_name, class_name, attr_name = TAB_MODULES[tab_idx]
+        tab = getattr(self, attr_name)
+        if tab is None:
+            tab_class = getattr(importlib.import_module(module_name), class_name)
+            tab = tab_class(self._tab_frames[tab_idx], self.status_var, self.log_redirect)
+            setattr(self, attr_name, tab)
+            self._redirects[tab_idx] = RedirectText(tab.log_text)
+        return tab
+
+    def _set_tab_inputs(self, tab_idx, file_path):
+        """
+        Wechselt zum angegebenen Tab und übernimmt die Datei in dessen Eingabefelder.
+
+        Args:
+            tab_idx: Index des Tabs im Notebook
+            file_path: Pfad zur gedroppten oder ausgewählten Datei
+        """
+        self.notebook.select(tab_idx)
+        tab = self._ensure_tab(tab_idx)
+
+        if tab_idx == 4:
+            # Schriftartdatei: Pfad übernehmen und Vorschau aktualisieren
+            tab.font_path_var.set(file_path)
+            tab.update_preview()
+            return
+
+        # Aktualisiere Eingabefeld
+        tab.input_entry.delete(0, tk.END)
+        tab.input_entry.insert(0, file_path)
+
+        # Schlage Ausgabedatei vor
+        base_name = os.path.splitext(os.path.basename(file_path))[0]
+        suffix = "_repaired" if tab_idx == 3 else ""
+        tab.output_entry.delete(0, tk.END)
+        tab.output_entry.insert(0, f"{base_name}{suffix}.stl")
+
     def setup_drag_drop(self):
         """Richtet Drag & Drop für die Anwendung ein"""
 
@@ -206,47 +249,10 @@ class STL3DApp:
             file_path = files[0]
 
             # Bestimme Dateityp und wähle entsprechenden Tab
-            filename, extension = os.path.splitext(file_path.lower())
-
-            if extension in ['.jpg', '.jpeg', '.png', '.bmp', '.gif', '.tiff']:
-                # Bild
-                tab_idx = 0  # Image to STL
-                self.notebook.select(tab_idx)
-
-                # Aktualisiere Eingabefeld
-                self.image_to_stl.input_entry.delete(0, tk.END)
-                self.image_to_stl.input_entry.insert(0, file_path)
-
-                # Schlage Ausgabedatei vor
-                base_name = os.path.splitext(os.path.basename(file_path))[0]
-                output_file = f"{base_name}.stl"
-                self.image_to_stl.output_entry.delete(0, tk.END)
-                self.image_to_stl.output_entry.insert(0, output_file)
-
-            elif extension == '.stl':
-                # STL-Datei
-                tab_idx = 3  # STL Repair
-                self.notebook.select(tab_idx)
-
-                # Aktualisiere Eingabefeld
-                self.stl_repair.input_entry.delete(0, tk.END)
-                self.stl_repair.input_entry.insert(0, file_path)
-
-                # Schlage Ausgabedatei vor
-                base_name = os.path.splitext(os.path.basename(file_path))[0]
-                output_file = f"{base_name}_repaired.stl"
-                self.stl_repair.output_entry.delete(0, tk.END)
-                self.stl_repair.output_entry.insert(0, output_file)
-
-            elif extension in ['.ttf', '.otf', '.ttc']:
-                # Schriftartdatei
-                tab_idx = 4  # Text to STL
-                self.notebook.select(tab_idx)
-
-                # Aktualisiere Schriftart-Pfad
-                self.text_to_stl.font_path_var.set(file_path)
-                # Aktualisiere Vorschau
-                self.text_to_stl.update_preview()
+            extension = os.path.splitext(file_path)[1].lower()
+            tab_idx = EXTENSION_TABS.get(extension)
+            if tab_idx is not None:
+                self._set_tab_inputs(tab_idx, file_path)
 
             self.status_var.set(f"Datei geladen: {file_path}")
 
@@ -273,56 +279,14 @@ class STL3DApp:
         ]
         filename = filedialog.askopenfilename(filetypes=filetypes)
         if filename:
-            # Datei wurde ausgewählt, fingieren eines Drag & Drop-Events
+            # Datei wurde ausgewählt, Verarbeitung wie bei einem Drop-Event
             self.status_var.set("Datei wird geladen...")
-            # Verarbeite die Datei wie ein Drop-Event
-            filename_ext = os.path.splitext(filename.lower())[1]
-            if filename_ext in ['.jpg', '.jpeg', '.png', '.bmp', '.gif', '.tiff', '.stl', '.ttf', '.otf', '.ttc']:
-                self.setup_drag_drop()  # Stelle sicher, dass Drag & Drop eingerichtet ist
-                # Fingiere ein Drag & Drop mit dem ausgewählten Dateinamen
-                filename, extension = os.path.splitext(filename.lower())
-
-                if extension in ['.jpg', '.jpeg', '.png', '.bmp', '.gif', '.tiff']:
-                    # Bild
-                    tab_idx = 0  # Image to STL
-                    self.notebook.select(tab_idx)
-
-                    # Aktualisiere Eingabefeld
-                    self.image_to_stl.input_entry.delete(0, tk.END)
-                    self.image_to_stl.input_entry.insert(0, filename + extension)
-
-                    # Schlage Ausgabedatei vor
-                    base_name = os.path.splitext(os.path.basename(filename + extension))[0]
-                    output_file = f"{base_name}.stl"
-                    self.image_to_stl.output_entry.delete(0, tk.END)
-                    self.image_to_stl.output_entry.insert(0, output_file)
-
-                elif extension == '.stl':
-                    # STL-Datei
-                    tab_idx = 3  # STL Repair
-                    self.notebook.select(tab_idx)
-
-                    # Aktualisiere Eingabefeld
-                    self.stl_repair.input_entry.delete(0, tk.END)
-                    self.stl_repair.input_entry.insert(0, filename + extension)
-
-                    # Schlage Ausgabedatei vor
-                    base_name = os.path.splitext(os.path.basename(filename + extension))[0]
-                    output_file = f"{base_name}_repaired.stl"
-                    self.stl_repair.output_entry.delete(0, tk.END)
-                    self.stl_repair.output_entry.insert(0, output_file)
-
-                elif extension in ['.ttf', '.otf', '.ttc']:
-                    # Schriftartdatei
-                    tab_idx = 4  # Text to STL
-                    self.notebook.select(tab_idx)
-
-                    # Aktualisiere Schriftart-Pfad
-                    self.text_to_stl.font_path_var.set(filename + extension)
-                    # Aktualisiere Vorschau
-                    self.text_to_stl.update_preview()
-
-                self.status_var.set(f"Datei geladen: {filename + extension}")
+            tab_idx = EXTENSION_TABS.get(os.path.splitext(filename)[1].lower())
+            if tab_idx is None:
+                return
+
+            self._set_tab_inputs(tab_idx, filename)
+            self.status_var.set(f"Datei geladen: {filename}")
 
     def open_output_dir(self):
         """Öffnet das Ausgabeverzeichnis im Dateimanager"""
@@ -4,15 +4,20 @@ Modul zur Erstellung von 3D-Modellen aus Höhenlinien eines Bildes
 
 import os
 import datetime
+import functools
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
 import matplotlib.pyplot as plt
 from matplotlib import cm
 from PIL import Image
 from stl import mesh
 import cv2
-from scipy.ndimage import gaussian_filter
-from tqdm import tqdm
 from utils.file_utils import ensure_directory_exists
+from utils.mesh_utils import fill_mesh_vectors, write_binary_stl
+from utils.image_cache import load_cached_image
+
+# 3x3-Strukturelement für Dilatation und Closing
+KERNEL_3X3 = np.ones((3, 3), np.uint8)
 
 def create_output_dir(script_name="contour-crafting"):
     """
@@ -54,11 +59,79 @@ def normalize_heightmap(heightmap):
     Returns:
         Normalisiertes Höhenkarten-Array
     """
-    min_val = np.min(heightmap)
-    max_val = np.max(heightmap)
-    return (heightmap - min_val) / (max_val - min_val)
+    # Min/Max-Skalierung in einem Durchgang; ein flaches Bild ergibt ein Nullbild
+    return cv2.normalize(heightmap, None, 0, 1, cv2.NORM_MINMAX, dtype=cv2.CV_64F)
+
+def load_heightmap(image_path):
+    """
+    Lädt ein Bild und liefert die auf 0 bis 1 normalisierte Höhenkarte.
+    
+    Args:
+        image_path: Pfad zum Bild
+        
+    Returns:
+        Normalisiertes Höhenkarten-Array
+    """
+    return normalize_heightmap(load_image(image_path))
+
+@functools.lru_cache(maxsize=8)
+def gaussian_kernel(sigma):
+    """
+    Berechnet einen normierten 1D-Gaußkern und speichert ihn für wiederholte Aufrufe.
+    
+    Der Radius von 4*sigma entspricht dem Standard von scipy.ndimage.gaussian_filter.
+    
+    Args:
+        sigma: Standardabweichung des Gaußkerns
+        
+    Returns:
+        1D-Kern als float64-Array (nicht verändern, da zwischengespeichert)
+    """
+    radius = int(4 * sigma + 0.5)
+    x = np.arange(-radius, radius + 1)
+    kernel = np.exp(-x * x / (2 * sigma * sigma))
+    return kernel / kernel.sum()
+
+def threshold_contours(img_uint8, threshold, close_kernel=None):
+    """
+    Binarisiert das Bild an einem Schwellenwert und findet die äußeren Konturen.
+    
+    Args:
+        img_uint8: Graustufenbild als uint8-Array
+        threshold: Schwellenwert für die Binarisierung
+        close_kernel: Strukturelement für ein morphologisches Closing (None = kein Closing)
+        
+    Returns:
+        Liste der gefundenen Konturen
+    """
+    _, binary = cv2.threshold(img_uint8, threshold, 255, cv2.THRESH_BINARY)
+
+    if close_kernel is not None:
+        binary = cv2.morphologyEx(binary, cv2.MORPH_CLOSE, close_kernel)
+
+    contours, _ = cv2.findContours(binary, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    return contours
+
+def contours_per_threshold(img_uint8, thresholds, close_kernel=None):
+    """
+    Findet die Konturen für mehrere Schwellenwerte parallel.
+    
+    OpenCV gibt während threshold/findContours den GIL frei, daher laufen die
+    einzelnen Schwellenwerte in einem Thread-Pool tatsächlich gleichzeitig.
+    
+    Args:
+        img_uint8: Graustufenbild als uint8-Array
+        thresholds: Folge von Schwellenwerten
+        close_kernel: Strukturelement für ein morphologisches Closing (None = kein Closing)
+        
+    Returns:
+        Liste der Konturlisten in der Reihenfolge der Schwellenwerte
+    """
+    with ThreadPoolExecutor() as executor:
+        return list(executor.map(lambda t: threshold_contours(img_uint8, t, close_kernel), thresholds))
 
-def extract_contours(heightmap, num_contours=10, smoothing=1, invert=False, is_photo=False):
+def extract_contours(heightmap, num_contours=10, smoothing=1, invert=False, is_photo=False,
+                     debug=False, debug_dir="."):
     """
     Extrahiert Höhenlinien aus der Höhenkarte.
     
@@ -68,53 +141,54 @@ def extract_contours(heightmap, num_contours=10, smoothing=1, invert=False, is_p
         smoothing: Stärke der Glättung
         invert: Wenn True, wird das Bild invertiert
         is_photo: Wenn True, wird der Foto-Modus aktiviert
+        debug: Wenn True, wird im Foto-Modus das Kantenbild gespeichert
+        debug_dir: Verzeichnis für das Kantenbild (edges_debug.png)
         
     Returns:
         Tupel (contours, heights) der extrahierten Konturen und zugehörigen Höhen
     """
-    original_heightmap = heightmap.copy()
-
     # Bild bei Bedarf invertieren
     if invert:
         heightmap = 1.0 - heightmap
 
     # Glätten, wenn erforderlich
     if smoothing > 1:
-        heightmap = gaussian_filter(heightmap, sigma=smoothing)
+        # Separabel mit zwischengespeichertem 1D-Kern falten, Ränder gespiegelt
+        kernel = gaussian_kernel(smoothing)
+        heightmap = cv2.sepFilter2D(heightmap.astype(np.float64), -1, kernel, kernel,
+                                    borderType=cv2.BORDER_REFLECT)
 
     # Bei Fotos: Vorverarbeitung für bessere Konturen
     if is_photo:
         # Kontrast erhöhen
         heightmap = np.clip((heightmap - 0.5) * 1.5 + 0.5, 0, 1)
 
+        # Gemeinsamer uint8-Puffer für Kanten- und Gradientenfilter
+        photo_uint8 = (heightmap * 255).astype(np.uint8)
+
         # Kantenfilter anwenden für bessere Konturen
-        edges = cv2.Canny((heightmap * 255).astype(np.uint8), 30, 100)
+        edges = cv2.Canny(photo_uint8, 30, 100)
 
         # Erweitern der Kanten für bessere Erkennung
-        kernel = np.ones((3, 3), np.uint8)
-        edges = cv2.dilate(edges, kernel, iterations=1)
+        edges = cv2.dilate(edges, KERNEL_3X3, iterations=1)
 
         # Debug-Visualisierung der Kanten
-        plt.figure(figsize=(12, 10))
-        plt.imshow(edges, cmap='gray')
-        plt.title('Kantenerkennung für Konturen')
-        plt.savefig("edges_debug.png")
-        plt.close()
+        if debug:
+            cv2.imwrite(os.path.join(debug_dir, "edges_debug.png"), edges)
 
-        # Mit Canny gefundene Kanten in ein Bild umwandeln
-        edge_heightmap = edges.astype(float) / 255.0
+        # Sobel-Filter für graduelle Übergänge direkt auf dem uint8-Bild
+        sobelx = cv2.Sobel(photo_uint8, cv2.CV_16S, 1, 0, ksize=3)
+        sobely = cv2.Sobel(photo_uint8, cv2.CV_16S, 0, 1, ksize=3)
+        sobel = cv2.magnitude(sobelx.astype(np.float32), sobely.astype(np.float32))
 
-        # Sobel-Filter für graduelle Übergänge
-        sobelx = cv2.Sobel(heightmap, cv2.CV_64F, 1, 0, ksize=3)
-        sobely = cv2.Sobel(heightmap, cv2.CV_64F, 0, 1, ksize=3)
-        sobel = np.sqrt(sobelx ** 2 + sobely ** 2)
-        sobel = sobel / np.max(sobel)  # Normalisieren
+        # Auf 0..255 normalisieren (flache Bilder ergeben ein Nullbild)
+        sobel_uint8 = cv2.normalize(sobel, None, 0, 255, cv2.NORM_MINMAX, dtype=cv2.CV_8U)
 
         # Kombinieren von Kanten und Gradienten
-        heightmap = 0.7 * sobel + 0.3 * edge_heightmap
-
-    # Höhenkarte in ein Format konvertieren, das OpenCV verarbeiten kann
-    img_uint8 = (heightmap * 255).astype(np.uint8)
+        img_uint8 = cv2.addWeighted(sobel_uint8, 0.7, edges, 0.3, 0)
+    else:
+        # Höhenkarte in ein Format konvertieren, das OpenCV verarbeiten kann
+        img_uint8 = (heightmap * 255).astype(np.uint8)
 
     # Konturen für Fotos extrahieren
     if is_photo:
@@ -124,29 +198,33 @@ def extract_contours(heightmap, num_contours=10, smoothing=1, invert=False, is_p
         # Mehrere Schwellenwerte für Foto ausprobieren
         thresholds = np.linspace(50, 200, num_contours)
 
-        for i, threshold in enumerate(thresholds):
-            # Binary Threshold anwenden
-            _, binary = cv2.threshold(img_uint8, threshold, 255, cv2.THRESH_BINARY)
-
-            # Morphologische Operationen zur Verbesserung der Konturen
-            kernel = np.ones((3, 3), np.uint8)
-            binary = cv2.morphologyEx(binary, cv2.MORPH_CLOSE, kernel)
+        # Binary Threshold, Closing zur Verbesserung der Konturen und Konturensuche
+        # für alle Schwellenwerte parallel ausführen
+        level_contours = contours_per_threshold(img_uint8, thresholds, close_kernel=KERNEL_3X3)
 
-            # Konturen finden
-            contours, _ = cv2.findContours(binary, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        max_area = 0.5 * img_uint8.shape[0] * img_uint8.shape[1]
 
+        for i, contours in enumerate(level_contours):
             for contour in contours:
-                # Filtern nach Konturlänge und Fläche
+                # Filtern nach Konturlänge (günstigste Prüfung zuerst)
+                if len(contour) < 5:
+                    continue
+
+                # Nur gleichmäßig verteilte Konturen hinzufügen
+                if i % 2 != 0 and len(contours_all) >= 5:
+                    continue
+
+                # Filtern nach Fläche
                 area = cv2.contourArea(contour)
-                if len(contour) >= 5 and area > 100 and area < 0.5 * img_uint8.shape[0] * img_uint8.shape[1]:
-                    # Konturen vereinfachen, um die Anzahl der Punkte zu reduzieren
-                    epsilon = 0.002 * cv2.arcLength(contour, True)
-                    approx = cv2.approxPolyDP(contour, epsilon, True)
+                if area <= 100 or area >= max_area:
+                    continue
 
-                    # Nur gleichmäßig verteilte Konturen hinzufügen
-                    if i % 2 == 0 or len(contours_all) < 5:
-                        contours_all.append(approx)
-                        heights.append((i + 1) / len(thresholds))
+                # Konturen vereinfachen, um die Anzahl der Punkte zu reduzieren
+                epsilon = 0.002 * cv2.arcLength(contour, True)
+                approx = cv2.approxPolyDP(contour, epsilon, True)
+
+                contours_all.append(approx)
+                heights.append((i + 1) / len(thresholds))
 
         print(f"Photo-Modus ergab {len(contours_all)} Konturen")
 
@@ -187,20 +265,21 @@ def extract_contours(heightmap, num_contours=10, smoothing=1, invert=False, is_p
 
     # Fallback: Original-Methode mit mehreren Schwellenwerten
     print("Verwende Fallback-Methode mit mehreren Schwellenwerten")
-    
+
+    # Im Foto-Modus liegt die kombinierte Höhenkarte nur als uint8-Bild vor
+    if is_photo:
+        heightmap = img_uint8 / 255.0
+
     min_val = np.min(heightmap)
     max_val = np.max(heightmap)
     step = (max_val - min_val) / num_contours
     levels = np.arange(min_val + step, max_val, step)
     
-    for i, level in enumerate(levels):
-        # Schwellenwert für diese Höhe
-        threshold = int(((level - min_val) / (max_val - min_val)) * 255)
-        _, binary = cv2.threshold(img_uint8, threshold, 255, cv2.THRESH_BINARY)
-
-        # Konturen finden
-        contours, _ = cv2.findContours(binary, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    # Schwellenwerte für alle Höhen und Konturen parallel finden
+    thresholds = [int(((level - min_val) / (max_val - min_val)) * 255) for level in levels]
+    level_contours = contours_per_threshold(img_uint8, thresholds)
 
+    for i, contours in enumerate(level_contours):
         # Nur Konturen mit ausreichender Länge hinzufügen
         for contour in contours:
             if len(contour) >= 5:  # Mindestens 5 Punkte für eine sinnvolle Kontur
@@ -213,83 +292,116 @@ def extract_contours(heightmap, num_contours=10, smoothing=1, invert=False, is_p
 
     return contours_all, heights
 
-def create_contour_mesh(contours, heights, image_shape, extrusion_height=1.0, base_height=0.5):
+def fill_contour_arrays_numpy(points, offsets, z_vals, height, width):
     """
-    Erstellt ein 3D-Mesh aus den Höhenlinien.
+    Vektorisierte NumPy-Variante von numba_kernels.fill_contour_arrays für Systeme ohne Numba.
     
     Args:
-        contours: Liste der Konturen
-        heights: Liste der Höhenwerte für jede Kontur
-        image_shape: Tupel (height, width) der Bildgröße
-        extrusion_height: Skalierungsfaktor für die Höhe
-        base_height: Höhe der Basisebene
+        points: (N, 2)-Array aller Konturpunkte hintereinander
+        offsets: (M+1)-Array mit den Startindizes der Konturen in points
+        z_vals: (M)-Array mit der Z-Höhe jeder Kontur
+        height: Bildhöhe
+        width: Bildbreite
         
     Returns:
-        mesh.Mesh-Objekt des 3D-Modells
+        Tupel (vertices, faces)
     """
-    height, width = image_shape
+    counts = np.diff(offsets)
+    starts = np.repeat(offsets[:-1], counts)
+    idx = np.arange(points.shape[0])
 
-    vertices = []
-    faces = []
-    vertex_count = 0
+    # Nachfolger jedes Punkts innerhalb seiner Kontur (letzter Punkt schließt den Ring)
+    next_idx = starts + (idx - starts + 1) % np.repeat(counts, counts)
 
-    # Basisfläche erstellen (optional)
-    base_vertices = [
-        [0, 0, 0],
-        [width, 0, 0],
-        [width, height, 0],
-        [0, height, 0]
-    ]
+    base_vertices = np.array([[0, 0, 0], [width, 0, 0], [width, height, 0], [0, height, 0]])
+    contour_vertices = np.column_stack([points[:, 0], height - points[:, 1], np.repeat(z_vals, counts)])
+    vertices = np.concatenate([base_vertices, contour_vertices]).astype(np.float32)
 
-    for v in base_vertices:
-        vertices.append(v)
+    base_faces = np.array([[0, 1, 2], [0, 2, 3]], dtype=np.int64)
+    contour_faces = np.column_stack([idx, next_idx, starts]) + 4
+    faces = np.concatenate([base_faces, contour_faces]).astype(np.int64)
 
-    # Basisfläche aus zwei Dreiecken
-    faces.append([0, 1, 2])
-    faces.append([0, 2, 3])
-    vertex_count = 4
+    return vertices, faces
 
-    # Für jede Kontur
-    for i, (contour, contour_height) in enumerate(tqdm(zip(contours, heights),
-                                                    desc="Erstelle 3D-Konturen",
-                                                    total=len(contours))):
-        # Z-Höhe für diese Kontur
-        z = contour_height * extrusion_height + base_height
+@functools.lru_cache(maxsize=1)
+def contour_array_filler():
+    """
+    Liefert die schnellste verfügbare Implementierung zum Füllen der Mesh-Arrays.
+    
+    Numba wird erst beim ersten Aufruf importiert; die parallele Schleife über
+    die Konturen liegt kompiliert im Numba-Cache. Ohne Numba wird die
+    NumPy-Variante verwendet.
+    
+    Returns:
+        Funktion mit der Signatur von fill_contour_arrays_numpy
+    """
+    try:
+        from modules.numba_kernels import fill_contour_arrays
+    except ImportError:
+        return fill_contour_arrays_numpy
 
-        # Anzahl der Punkte in dieser Kontur
-        n_points = len(contour)
+    return fill_contour_arrays
 
-        if n_points < 3:
-            continue  # Überspringe zu kleine Konturen
+def create_contour_arrays(contours, heights, image_shape, extrusion_height=1.0, base_height=0.5):
+    """
+    Erstellt Vertex- und Flächenarrays des 3D-Modells aus den Höhenlinien.
+    
+    Args:
+        contours: Liste der Konturen
+        heights: Liste der Höhenwerte für jede Kontur
+        image_shape: Tupel (height, width) der Bildgröße
+        extrusion_height: Skalierungsfaktor für die Höhe
+        base_height: Höhe der Basisebene
+        
+    Returns:
+        Tupel (vertices, faces)
+    """
+    height, width = image_shape
 
-        # Für jeden Punkt in der Kontur
-        contour_start_idx = vertex_count
+    # Punktanzahl je Kontur; zu kleine Konturen (< 3 Punkte) werden übersprungen
+    sizes = np.fromiter((len(contour) for contour in contours), dtype=np.int64, count=len(contours))
+    keep = sizes >= 3
+    counts = sizes[keep]
+    z_vals = np.asarray(heights, dtype=np.float64)[keep]
 
-        for point in contour:
-            # Punkt umkehren, damit y-Achse richtig orientiert ist
-            x, y = point[0][0], height - point[0][1]
-            vertices.append([x, y, z])
-            vertex_count += 1
+    # Alle Punkte in einen zusammenhängenden Puffer legen
+    if counts.size:
+        points = np.concatenate([contour.reshape(-1, 2)
+                                 for contour, kept in zip(contours, keep) if kept]).astype(np.float64)
+    else:
+        points = np.empty((0, 2), dtype=np.float64)
 
-        # Verbinde Punkte, um Flächen zu erstellen
-        for j in range(n_points):
-            # Verwende Dreiecke zwischen benachbarten Punkten
-            idx1 = contour_start_idx + j
-            idx2 = contour_start_idx + (j + 1) % n_points
+    # Startindex jeder Kontur als Präfixsumme der Punktanzahlen
+    offsets = np.zeros(len(counts) + 1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
 
-            # Füge Dreieck hinzu (gegen den Uhrzeigersinn für korrekte Normalen)
-            faces.append([idx1, idx2, contour_start_idx])
+    # Z-Höhe für jede Kontur
+    z_vals = z_vals * extrusion_height + base_height
 
-    vertices = np.array(vertices)
-    faces = np.array(faces)
+    return contour_array_filler()(points, offsets, z_vals, float(height), float(width))
+
+def create_contour_mesh(contours, heights, image_shape, extrusion_height=1.0, base_height=0.5):
+    """
+    Erstellt ein 3D-Mesh aus den Höhenlinien.
+    
+    Args:
+        contours: Liste der Konturen
+        heights: Liste der Höhenwerte für jede Kontur
+        image_shape: Tupel (height, width) der Bildgröße
+        extrusion_height: Skalierungsfaktor für die Höhe
+        base_height: Höhe der Basisebene
+        
+    Returns:
+        mesh.Mesh-Objekt des 3D-Modells
+    """
+    vertices, faces = create_contour_arrays(contours, heights, image_shape,
+                                            extrusion_height, base_height)
 
     # Mesh erstellen
     contour_mesh = mesh.Mesh(np.zeros(len(faces), dtype=mesh.Mesh.dtype))
 
-    # Vertices für jedes Dreieck setzen
-    for i, f in enumerate(faces):
-        for j in range(3):
-            contour_mesh.vectors[i][j] = vertices[f[j]]
+    # Dreiecke blockweise zum Mesh hinzufügen
+    fill_mesh_vectors(contour_mesh.vectors, vertices, faces)
 
     return contour_mesh
 
@@ -323,9 +435,32 @@ def visualize_contours(heightmap, contours, output_path):
     plt.savefig(output_path)
     plt.close()
 
+def build_output_path(output_path, use_timestamp=False):
+    """
+    Bestimmt den Pfad der STL-Datei im Ausgabeverzeichnis.
+
+    Args:
+        output_path: Gewünschter Name der Ausgabe-STL-Datei
+        use_timestamp: Wenn True, wird dem Dateinamen ein Zeitstempel hinzugefügt
+
+    Returns:
+        Pfad zur Ausgabedatei
+    """
+    # Ausgabeverzeichnis erstellen
+    output_dir = create_output_dir()
+
+    # Zeitstempel einfügen, falls gewünscht
+    if use_timestamp:
+        timestamp = datetime.datetime.now().strftime("%Y-%m-%d-%H-%M-%S")
+        base_name, ext = os.path.splitext(os.path.basename(output_path))
+        output_path = f"{base_name}_{timestamp}{ext}"
+
+    # Ausgabepfad anpassen
+    return os.path.join(output_dir, os.path.basename(output_path))
+
 def contour_crafting_process(image_path, output_path="output_contour.stl", num_contours=10,
                         extrusion_height=1.0, base_height=0.5, smoothing=1, invert=False, 
-                        is_photo=False, use_timestamp=False):
+                        is_photo=False, use_timestamp=False, debug=False, visualize=True):
     """
     Hauptfunktion für das Contour Crafting.
     
@@ -339,57 +474,46 @@ def contour_crafting_process(image_path, output_path="output_contour.stl", num_c
         invert: Wenn True, wird das Bild invertiert
         is_photo: Wenn True, wird der Foto-Modus aktiviert
         use_timestamp: Wenn True, wird der Ausgabedatei ein Zeitstempel hinzugefügt
+        debug: Wenn True, werden Höhenkarte und Kantenbild als Debug-Bilder gespeichert
+        visualize: Wenn True, wird eine Visualisierung der Höhenlinien gespeichert
         
     Returns:
         Der vollständige Pfad zur erstellten STL-Datei
     """
     print(f"Verarbeite {image_path}...")
 
-    # Ausgabeverzeichnis erstellen
-    output_dir = create_output_dir()
+    # Ausgabepfad im Ausgabeverzeichnis bestimmen
+    output_path = build_output_path(output_path, use_timestamp)
+    output_dir = os.path.dirname(output_path)
 
-    # Zeitstempel einfügen, falls gewünscht
-    if use_timestamp:
-        timestamp = datetime.datetime.now().strftime("%Y-%m-%d-%H-%M-%S")
-        base_name, ext = os.path.splitext(os.path.basename(output_path))
-        output_path = f"{base_name}_{timestamp}{ext}"
-
-    # Ausgabepfad anpassen
-    output_path = os.path.join(output_dir, os.path.basename(output_path))
-
-    # Bild laden
-    heightmap = load_image(image_path)
-
-    # Höhenkarte normalisieren
-    heightmap = normalize_heightmap(heightmap)
+    # Bild laden und Höhenkarte normalisieren (bei gleichem Bild aus dem Cache)
+    heightmap = load_cached_image(image_path, load_heightmap)
 
     # Debug-Visualisierung der Höhenkarte speichern
-    plt.figure(figsize=(12, 10))
-    plt.imshow(heightmap, cmap='gray')
-    plt.colorbar(label='Höhenwerte')
-    plt.title('Originale Höhenkarte')
-    debug_path = os.path.join(output_dir, os.path.splitext(os.path.basename(output_path))[0] + "_original.png")
-    plt.savefig(debug_path)
-    plt.close()
-    print(f"Originale Höhenkarte gespeichert unter {debug_path}")
+    if debug:
+        debug_path = os.path.join(output_dir, os.path.splitext(os.path.basename(output_path))[0] + "_original.png")
+        cv2.imwrite(debug_path, (heightmap * 255).astype(np.uint8))
+        print(f"Originale Höhenkarte gespeichert unter {debug_path}")
 
     # Höhenlinien extrahieren
     print("Extrahiere Höhenlinien...")
-    contours, heights = extract_contours(heightmap, num_contours, smoothing, invert, is_photo)
+    contours, heights = extract_contours(heightmap, num_contours, smoothing, invert, is_photo,
+                                         debug=debug, debug_dir=output_dir)
     print(f"{len(contours)} Höhenlinien extrahiert.")
 
     # Visualisierung der Höhenlinien
-    vis_path = os.path.join(output_dir, os.path.splitext(os.path.basename(output_path))[0] + "_contours.png")
-    visualize_contours(heightmap, contours, vis_path)
-    print(f"Höhenlinien-Visualisierung gespeichert unter {vis_path}")
+    if visualize:
+        vis_path = os.path.join(output_dir, os.path.splitext(os.path.basename(output_path))[0] + "_contours.png")
+        visualize_contours(heightmap, contours, vis_path)
+        print(f"Höhenlinien-Visualisierung gespeichert unter {vis_path}")
 
     # 3D-Mesh erstellen
     print("Erstelle 3D-Mesh aus Höhenlinien...")
-    contour_mesh = create_contour_mesh(contours, heights, heightmap.shape,
-                                    extrusion_height, base_height)
+    vertices, faces = create_contour_arrays(contours, heights, heightmap.shape,
+                                            extrusion_height, base_height)
 
-    # STL-Datei speichern
-    contour_mesh.save(output_path)
+    # STL-Datei direkt aus Vertices und Faces schreiben
+    write_binary_stl(output_path, vertices, faces)
     print(f"3D-Modell gespeichert unter {output_path}")
 
     return output_path
@@ -3,11 +3,23 @@ Modul zur Konvertierung von Bildern in STL-Dateien
 """
 
 import os
+import math
 import datetime
 import numpy as np
-from PIL import Image, ImageFilter
-from stl import mesh
+import cv2
+from PIL import Image
 from utils.file_utils import ensure_directory_exists
+from utils.mesh_utils import write_binary_stl
+from utils.image_cache import load_cached_image
+
+# Rotationsmatrizen für 90-Grad-Drehungen (Zeilenvektoren: v_neu = v @ R)
+ROTATION_X = np.array([[1, 0, 0], [0, 0, -1], [0, 1, 0]], dtype=np.float32)  # Y = Z, Z = -Y
+ROTATION_Y = np.array([[0, 0, -1], [0, 1, 0], [1, 0, 0]], dtype=np.float32)  # X = Z, Z = -X
+ROTATION_Z = np.array([[0, -1, 0], [1, 0, 0], [0, 0, 1]], dtype=np.float32)  # X = Y, Y = -X
+
+# Strukturelemente für die Maskenbereinigung im object_only-Modus
+STRUCTURE_3X3 = np.ones((3, 3), dtype=bool)
+STRUCTURE_2X2 = np.ones((2, 2), dtype=bool)
 
 def create_output_dir(script_name="image-to-stl"):
     """
@@ -23,32 +35,16 @@ def create_output_dir(script_name="image-to-stl"):
     ensure_directory_exists(output_dir)
     return output_dir
 
-def image_to_stl(image_path, output_path, width=None, height=None,
-                 max_height=5.0, base_height=1.0, invert=False,
-                 smooth=1, threshold=None, border=2, max_size=170,
-                 object_only=False, rotate_x=False, rotate_y=False, rotate_z=False, use_timestamp=False):
+def build_output_path(output_path, use_timestamp=False):
     """
-    Konvertiert ein Bild in eine STL-Datei
+    Bestimmt den Pfad der STL-Datei im Ausgabeverzeichnis.
 
     Args:
-        image_path: Pfad zum Eingabebild
-        output_path: Pfad zur Ausgabe-STL-Datei
-        width: Breite des 3D-Modells in mm (None = proportional zur Höhe)
-        height: Höhe des 3D-Modells in mm (None = original Bildverhältnis)
-        max_height: Maximale Höhe des Reliefs in mm
-        base_height: Dicke der Basis in mm
-        invert: Wenn True, werden helle Bereiche tiefer statt höher
-        smooth: Anzahl der Glättungsdurchgänge (0 für keine Glättung)
-        threshold: Schwellenwert für Hintergrunderkennung (0-255, None = keine Erkennung)
-        border: Randbreite in Pixeln
-        max_size: Maximale Dimension in mm
-        object_only: Nur das Objekt ohne Grundplatte erstellen
-        rotate_x: Wenn True, wird das Modell um 90 Grad um die X-Achse gedreht
-        rotate_y: Wenn True, wird das Modell um 90 Grad um die Y-Achse gedreht
-        rotate_z: Wenn True, wird das Modell um 90 Grad um die Z-Achse gedreht
+        output_path: Gewünschter Name der Ausgabe-STL-Datei
+        use_timestamp: Wenn True, wird dem Dateinamen ein Zeitstempel hinzugefügt
 
     Returns:
-        Der vollständige Pfad zur erstellten STL-Datei
+        Pfad zur Ausgabedatei (unverändert, wenn output_path nicht auf .stl endet)
     """
     # Ausgabeverzeichnis erstellen
     output_dir = create_output_dir()
@@ -65,24 +61,22 @@ def image_to_stl(image_path, output_path, width=None, height=None,
         # Ausgabepfad anpassen
         output_path = os.path.join(output_dir, f"{base_name}{ext}")
 
-    # Benötigte Bibliotheken importieren
-    try:
-        from scipy import ndimage
-        has_scipy = True
-    except ImportError:
-        has_scipy = False
-        print("WARNUNG: SciPy nicht installiert. Einige Funktionen werden deaktiviert.")
-        print("Für bessere Ergebnisse installiere SciPy: pip install scipy")
+    return output_path
 
-    if object_only:
-        try:
-            from skimage import measure
-            has_skimage = True
-        except ImportError:
-            has_skimage = False
-            print("WARNUNG: scikit-image nicht installiert. Verwende alternativen Ansatz.")
-            print("Für bessere Ergebnisse installiere scikit-image: pip install scikit-image")
+def load_image_data(image_path, width=None, height=None, max_size=170, smooth=1):
+    """
+    Lädt ein Bild als Graustufen-Array, skaliert und glättet es.
 
+    Args:
+        image_path: Pfad zum Eingabebild
+        width: Breite des 3D-Modells in mm (None = proportional zur Höhe)
+        height: Höhe des 3D-Modells in mm (None = original Bildverhältnis)
+        max_size: Maximale Dimension in mm
+        smooth: Anzahl der Glättungsdurchgänge (0 für keine Glättung)
+
+    Returns:
+        float32-Array der Grauwerte (0-255)
+    """
     # Bild laden und in Graustufen konvertieren
     img = Image.open(image_path)
 
@@ -136,12 +130,68 @@ def image_to_stl(image_path, output_path, width=None, height=None,
     # Bild entsprechend skalieren
     img = img.resize((width, height), Image.LANCZOS)
 
-    # Glättung anwenden
-    for _ in range(smooth):
-        img = img.filter(ImageFilter.SMOOTH)
-
     # In NumPy-Array konvertieren
-    height_map = np.array(img, dtype=np.float32)
+    image_data = np.asarray(img, dtype=np.float32)
+
+    # Glättung anwenden: ein Gauß-Durchgang ersetzt die wiederholte 3x3-Glättung
+    if smooth > 0:
+        sigma = max(0.5, 0.8 * math.sqrt(smooth))
+        image_data = cv2.GaussianBlur(image_data, (0, 0), sigma, borderType=cv2.BORDER_REFLECT)
+
+    return image_data
+
+def image_to_stl(image_path, output_path, width=None, height=None,
+                 max_height=5.0, base_height=1.0, invert=False,
+                 smooth=1, threshold=None, border=2, max_size=170,
+                 object_only=False, rotate_x=False, rotate_y=False, rotate_z=False, use_timestamp=False):
+    """
+    Konvertiert ein Bild in eine STL-Datei
+
+    Args:
+        image_path: Pfad zum Eingabebild
+        output_path: Pfad zur Ausgabe-STL-Datei
+        width: Breite des 3D-Modells in mm (None = proportional zur Höhe)
+        height: Höhe des 3D-Modells in mm (None = original Bildverhältnis)
+        max_height: Maximale Höhe des Reliefs in mm
+        base_height: Dicke der Basis in mm
+        invert: Wenn True, werden helle Bereiche tiefer statt höher
+        smooth: Anzahl der Glättungsdurchgänge (0 für keine Glättung)
+        threshold: Schwellenwert für Hintergrunderkennung (0-255, None = keine Erkennung)
+        border: Randbreite in Pixeln
+        max_size: Maximale Dimension in mm
+        object_only: Nur das Objekt ohne Grundplatte erstellen
+        rotate_x: Wenn True, wird das Modell um 90 Grad um die X-Achse gedreht
+        rotate_y: Wenn True, wird das Modell um 90 Grad um die Y-Achse gedreht
+        rotate_z: Wenn True, wird das Modell um 90 Grad um die Z-Achse gedreht
+
+    Returns:
+        Der vollständige Pfad zur erstellten STL-Datei
+    """
+    # Ausgabepfad im Ausgabeverzeichnis bestimmen
+    output_path = build_output_path(output_path, use_timestamp)
+
+    # Benötigte Bibliotheken importieren
+    try:
+        from scipy import ndimage
+        has_scipy = True
+    except ImportError:
+        has_scipy = False
+        print("WARNUNG: SciPy nicht installiert. Einige Funktionen werden deaktiviert.")
+        print("Für bessere Ergebnisse installiere SciPy: pip install scipy")
+
+    if object_only:
+        try:
+            from skimage import measure
+            has_skimage = True
+        except ImportError:
+            has_skimage = False
+            print("WARNUNG: scikit-image nicht installiert. Verwende alternativen Ansatz.")
+            print("Für bessere Ergebnisse installiere scikit-image: pip install scikit-image")
+
+    # Bild laden, skalieren und glätten (bei gleichem Bild und gleichen Parametern aus dem Cache)
+    image_data = load_cached_image(image_path, load_image_data, width, height, max_size, smooth)
+
+    height_map = image_data
 
     # Invertieren, falls gewünscht
     if invert:
@@ -152,7 +202,7 @@ def image_to_stl(image_path, output_path, width=None, height=None,
 
     # Hintergrund entfernen, falls Schwellenwert angegeben
     if threshold is not None:
-        orig_data = np.array(img, dtype=np.float32)
+        orig_data = image_data
         if invert:
             mask = orig_data >= threshold
         else:
@@ -169,10 +219,6 @@ def image_to_stl(image_path, output_path, width=None, height=None,
         height_map = bordered_height_map
         rows, cols = height_map.shape
 
-    # Mesh erstellen
-    vertices = []
-    faces = []
-
     # Im object_only-Modus, Maske erstellen für Bereiche über der Basis
     object_mask = None
     if object_only and has_scipy:
@@ -184,7 +230,7 @@ def image_to_stl(image_path, output_path, width=None, height=None,
             effective_threshold = threshold
 
         # Maske für Bereiche über dem Threshold erstellen
-        orig_data = np.array(img, dtype=np.float32)
+        orig_data = image_data
         if invert:
             object_mask = orig_data < effective_threshold
         else:
@@ -195,11 +241,11 @@ def image_to_stl(image_path, output_path, width=None, height=None,
         original_mask = object_mask.copy()
 
         # Schritt 1: Führe eine Erosion durch, um den äußeren Rand zu entfernen
-        border_removal_kernel = np.ones((3, 3), dtype=bool)  # Größerer Kernel für stärkere Erosion
-        object_mask = ndimage.binary_erosion(object_mask, structure=border_removal_kernel, iterations=3)
+        # Größerer Kernel für stärkere Erosion
+        object_mask = ndimage.binary_erosion(object_mask, structure=STRUCTURE_3X3, iterations=3)
 
         # Schritt 2: Dann führe ein Closing aus, um Löcher zu schließen
-        object_mask = ndimage.binary_closing(object_mask, structure=np.ones((2, 2), dtype=bool), iterations=1)
+        object_mask = ndimage.binary_closing(object_mask, structure=STRUCTURE_2X2, iterations=1)
 
         # Schritt 3: Fülle kleine Löcher
         object_mask = ndimage.binary_fill_holes(object_mask)
@@ -212,7 +258,7 @@ def image_to_stl(image_path, output_path, width=None, height=None,
             object_mask = labeled_array == largest_component
 
         # Schritt 5: Führe eine leichte Dilatation aus, aber NICHT bis zum ursprünglichen Rand
-        object_mask = ndimage.binary_dilation(object_mask, structure=np.ones((2, 2), dtype=bool), iterations=1)
+        object_mask = ndimage.binary_dilation(object_mask, structure=STRUCTURE_2X2, iterations=1)
 
         # Schritt 6: Stelle sicher, dass wir nicht über die ursprüngliche Maske hinausgehen
         object_mask = np.logical_and(object_mask, original_mask)
@@ -230,14 +276,12 @@ def image_to_stl(image_path, output_path, width=None, height=None,
         # 3D-Volume erstellen
         z_scale = max_height
         z_size = int(max_height * 2)
-        volume = np.zeros((rows, cols, z_size), dtype=bool)
 
-        # Volume basierend auf Höhenkarte füllen
-        for i in range(rows):
-            for j in range(cols):
-                if object_mask[i, j]:
-                    z_height = int((height_map[i, j] - base_height) / max_height * (z_size - 1))
-                    volume[i, j, 0:max(1, z_height)] = True
+        # Volume basierend auf Höhenkarte füllen: jede Objektsäule ist bis zu ihrer
+        # Höhe (mindestens eine Schicht) gefüllt
+        z_heights = ((height_map - base_height) / max_height * (z_size - 1)).astype(np.int32)
+        z_heights = np.maximum(z_heights, 1)
+        volume = (np.arange(z_size)[None, None, :] < z_heights[:, :, None]) & object_mask[:, :, None]
 
         # Marching Cubes anwenden
         verts, faces, normals, values = measure.marching_cubes(volume, level=0.5)
@@ -256,140 +300,75 @@ def image_to_stl(image_path, output_path, width=None, height=None,
             object_only = False  # Deaktiviere object_only im Fallback
             print("Object-only-Modus deaktiviert, da erforderliche Bibliotheken fehlen.")
 
-        # Vertices für die Oberseite erzeugen (Höhenkarte)
-        for i in range(rows):
-            for j in range(cols):
-                # Im object_only-Modus nur Punkte für das Objekt hinzufügen
-                if not object_only or (object_only and object_mask is not None and object_mask[i, j]):
-                    vertices.append([j, (rows - 1) - i, height_map[i, j]])
-
-        # Wenn wir nicht im object_only-Modus sind, erstelle Unterseite
-        if not object_only:
-            # Vertices für die Unterseite erzeugen (flache Basis)
-            for i in range(rows):
-                for j in range(cols):
-                    vertices.append([j, (rows - 1) - i, 0])
-
-            # Dreiecke für das Mesh erzeugen
+        # Anzahl der Vertices in der oberen Hälfte
+        top_vertices = rows * cols
+
+        # Vertices für die Oberseite (Höhenkarte) und die Unterseite (flache Basis)
+        vertices = np.empty((2 * top_vertices, 3), dtype=np.float32)
+        top = vertices[:top_vertices].reshape(rows, cols, 3)
+        top[:, :, 0] = np.arange(cols)
+        top[:, :, 1] = ((rows - 1) - np.arange(rows))[:, None]
+        top[:, :, 2] = height_map
+        vertices[top_vertices:, :2] = vertices[:top_vertices, :2]
+        vertices[top_vertices:, 2] = 0
+
+        # Eckindizes aller Gitterzellen (oben links, oben rechts, unten links, unten rechts)
+        ii, jj = np.meshgrid(np.arange(rows - 1), np.arange(cols - 1), indexing='ij')
+        v00 = (ii * cols + jj).ravel()
+        v01 = v00 + 1
+        v10 = v00 + cols
+        v11 = v10 + 1
+
+        # Randsegmente der Seitenwände
+        t = top_vertices
+        front = np.arange(cols - 1)
+        back = (rows - 1) * cols + front
+        left = np.arange(rows - 1) * cols
+        right = left + (cols - 1)
+
+        # Je Zelle bzw. Randsegment zwei Dreiecke, als Zeile mit sechs Indizes
+        # direkt in das vorab angelegte Face-Array geschrieben
+        quad_blocks = [
             # Oberseite
-            for i in range(rows - 1):
-                for j in range(cols - 1):
-                    # Oberes Dreieck
-                    v1 = i * cols + j
-                    v2 = i * cols + (j + 1)
-                    v3 = (i + 1) * cols + j
-                    faces.append([v1, v2, v3])
-
-                    # Unteres Dreieck
-                    v1 = (i + 1) * cols + j
-                    v2 = i * cols + (j + 1)
-                    v3 = (i + 1) * cols + (j + 1)
-                    faces.append([v1, v2, v3])
-
-            # Anzahl der Vertices in der oberen Hälfte
-            top_vertices = rows * cols
-
+            (v00, v01, v10, v10, v01, v11),
             # Unterseite (invertierte Dreiecke)
-            for i in range(rows - 1):
-                for j in range(cols - 1):
-                    # Oberes Dreieck (invertiert)
-                    v1 = top_vertices + i * cols + j
-                    v2 = top_vertices + (i + 1) * cols + j
-                    v3 = top_vertices + i * cols + (j + 1)
-                    faces.append([v1, v2, v3])
-
-                    # Unteres Dreieck (invertiert)
-                    v1 = top_vertices + i * cols + (j + 1)
-                    v2 = top_vertices + (i + 1) * cols + j
-                    v3 = top_vertices + (i + 1) * cols + (j + 1)
-                    faces.append([v1, v2, v3])
-
+            (t + v00, t + v10, t + v01, t + v01, t + v10, t + v11),
             # Seitenwände
-            # Vordere Seite
-            for j in range(cols - 1):
-                v1 = j
-                v2 = j + 1
-                v3 = top_vertices + j
-                faces.append([v1, v2, v3])
-
-                v1 = j + 1
-                v2 = top_vertices + j + 1
-                v3 = top_vertices + j
-                faces.append([v1, v2, v3])
-
-            # Hintere Seite
-            for j in range(cols - 1):
-                v1 = (rows - 1) * cols + j
-                v2 = top_vertices + (rows - 1) * cols + j
-                v3 = (rows - 1) * cols + j + 1
-                faces.append([v1, v2, v3])
-
-                v1 = (rows - 1) * cols + j + 1
-                v2 = top_vertices + (rows - 1) * cols + j
-                v3 = top_vertices + (rows - 1) * cols + j + 1
-                faces.append([v1, v2, v3])
-
-            # Linke Seite
-            for i in range(rows - 1):
-                v1 = i * cols
-                v2 = top_vertices + i * cols
-                v3 = (i + 1) * cols
-                faces.append([v1, v2, v3])
-
-                v1 = (i + 1) * cols
-                v2 = top_vertices + i * cols
-                v3 = top_vertices + (i + 1) * cols
-                faces.append([v1, v2, v3])
-
-            # Rechte Seite
-            for i in range(rows - 1):
-                v1 = i * cols + (cols - 1)
-                v2 = (i + 1) * cols + (cols - 1)
-                v3 = top_vertices + i * cols + (cols - 1)
-                faces.append([v1, v2, v3])
-
-                v1 = (i + 1) * cols + (cols - 1)
-                v2 = top_vertices + (i + 1) * cols + (cols - 1)
-                v3 = top_vertices + i * cols + (cols - 1)
-                faces.append([v1, v2, v3])
-
-    # Vertices und Faces in NumPy-Arrays konvertieren
-    vertices = np.array(vertices, dtype=np.float32)
-    faces = np.array(faces, dtype=np.uint32)
-
-    # Rotationen anwenden
-    if rotate_x:
-        # Rotation um die X-Achse um 90 Grad
-        y_temp = vertices[:, 1].copy()
-        vertices[:, 1] = vertices[:, 2]  # Y = Z
-        vertices[:, 2] = -y_temp  # Z = -Y
-
-    if rotate_y:
-        # Rotation um die Y-Achse um 90 Grad
-        x_temp = vertices[:, 0].copy()
-        vertices[:, 0] = vertices[:, 2]  # X = Z
-        vertices[:, 2] = -x_temp  # Z = -X
-
-    if rotate_z:
-        # Rotation um die Z-Achse um 90 Grad
-        x_temp = vertices[:, 0].copy()
-        vertices[:, 0] = vertices[:, 1]  # X = Y
-        vertices[:, 1] = -x_temp  # Y = -X
-
-    # STL-Modell erstellen
-    # Anzahl der Dreiecke
-    num_faces = len(faces)
-
-    # STL-Mesh erstellen
-    stl_mesh = mesh.Mesh(np.zeros(num_faces, dtype=mesh.Mesh.dtype))
-
-    # Dreiecke zum Mesh hinzufügen
-    for i, face in enumerate(faces):
-        for j in range(3):
-            stl_mesh.vectors[i][j] = vertices[face[j]]
-
-    # STL-Datei speichern
-    stl_mesh.save(output_path)
+            (front, front + 1, t + front, front + 1, t + front + 1, t + front),
+            (back, t + back, back + 1, back + 1, t + back, t + back + 1),
+            (left, t + left, left + cols, left + cols, t + left, t + left + cols),
+            (right, right + cols, t + right, right + cols, t + right + cols, t + right),
+        ]
+
+        num_quads = 2 * len(v00) + 2 * len(front) + 2 * len(left)
+        faces = np.empty((2 * num_quads, 3), dtype=np.uint32)
+        quads = faces.reshape(num_quads, 6)
+
+        pos = 0
+        for block in quad_blocks:
+            count = len(block[0])
+            for k, column in enumerate(block):
+                quads[pos:pos + count, k] = column
+            pos += count
+
+    # Vertices und Faces als NumPy-Arrays mit passendem Datentyp
+    vertices = np.asarray(vertices, dtype=np.float32)
+    faces = np.asarray(faces, dtype=np.uint32)
+
+    # Rotationen anwenden: aktivierte Drehungen zu einer Matrix zusammenfassen
+    # und alle Vertices in einem Durchgang transformieren
+    if rotate_x or rotate_y or rotate_z:
+        rotation = np.eye(3, dtype=np.float32)
+        if rotate_x:
+            rotation = rotation @ ROTATION_X
+        if rotate_y:
+            rotation = rotation @ ROTATION_Y
+        if rotate_z:
+            rotation = rotation @ ROTATION_Z
+        vertices = vertices @ rotation
+
+    # STL-Datei direkt aus Vertices und Faces schreiben
+    write_binary_stl(output_path, vertices, faces)
 
     print(f"STL-Datei erfolgreich erstellt: {output_path}")
     print(f"Modellgröße: {cols}x{rows}x{max_height + base_height} mm")
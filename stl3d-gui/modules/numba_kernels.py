@@ -0,0 +1,106 @@
+"""
+Mit Numba kompilierte Schleifen zum Füllen von Mesh-Arrays
+
+Das Modul importiert Numba direkt und wird daher nur bei Bedarf geladen.
+Die Kernel werden parallel und mit cache=True kompiliert, sodass die
+Kompilierung nur beim ersten Start nach einer Änderung anfällt.
+"""
+
+import numpy as np
+from numba import njit, prange
+
+@njit(parallel=True, cache=True)
+def fill_contour_arrays(points, offsets, z_vals, height, width):
+    """
+    Füllt Vertex- und Flächenarrays für Basisfläche und Konturen in einfachen Schleifen.
+    
+    Wird von contour_crafting.contour_array_filler verwendet.
+    
+    Args:
+        points: (N, 2)-Array aller Konturpunkte hintereinander
+        offsets: (M+1)-Array mit den Startindizes der Konturen in points
+        z_vals: (M)-Array mit der Z-Höhe jeder Kontur
+        height: Bildhöhe
+        width: Bildbreite
+        
+    Returns:
+        Tupel (vertices, faces)
+    """
+    n_points = points.shape[0]
+    vertices = np.empty((n_points + 4, 3), dtype=np.float32)
+    faces = np.empty((n_points + 2, 3), dtype=np.int64)
+
+    # Basisfläche aus zwei Dreiecken
+    vertices[0, 0] = 0.0
+    vertices[0, 1] = 0.0
+    vertices[1, 0] = width
+    vertices[1, 1] = 0.0
+    vertices[2, 0] = width
+    vertices[2, 1] = height
+    vertices[3, 0] = 0.0
+    vertices[3, 1] = height
+    for k in range(4):
+        vertices[k, 2] = 0.0
+    faces[0, 0] = 0
+    faces[0, 1] = 1
+    faces[0, 2] = 2
+    faces[1, 0] = 0
+    faces[1, 1] = 2
+    faces[1, 2] = 3
+
+    # Jede Kontur schreibt in einen eigenen Bereich der Arrays (Offsets aus der
+    # Präfixsumme), daher können die Konturen unabhängig parallel laufen
+    for c in prange(offsets.shape[0] - 1):
+        first = offsets[c]
+        last = offsets[c + 1]
+        contour_start_idx = first + 4
+
+        for k in range(first, last):
+            # Punkt umkehren, damit y-Achse richtig orientiert ist
+            vertices[k + 4, 0] = points[k, 0]
+            vertices[k + 4, 1] = height - points[k, 1]
+            vertices[k + 4, 2] = z_vals[c]
+
+            # Dreieck zum nächsten Punkt (gegen den Uhrzeigersinn für korrekte Normalen)
+            next_k = k + 1 if k + 1 < last else first
+            faces[k + 2, 0] = k + 4
+            faces[k + 2, 1] = next_k + 4
+            faces[k + 2, 2] = contour_start_idx
+
+    return vertices, faces
+
+@njit(parallel=True, cache=True)
+def fill_grid_arrays(heightmap, scale_z, vertices, faces):
+    """
+    Füllt Vertex- und Flächenarrays des Höhenrasters in einfachen Schleifen.
+    
+    Wird von topographic_layering.grid_array_filler verwendet.
+    
+    Args:
+        heightmap: 2D-Array der Höhenwerte
+        scale_z: Skalierungsfaktor für die Höhe (float32)
+        vertices: (H*W, 3)-Zielarray der Vertices
+        faces: (2*(H-1)*(W-1), 3)-Zielarray der Flächen
+    """
+    height, width = heightmap.shape
+
+    # Jede Zeile schreibt in einen eigenen Bereich der Arrays, daher können
+    # die Zeilen unabhängig parallel laufen
+    for y in prange(height):
+        for x in range(width):
+            i = y * width + x
+
+            # Y-Koordinate wird invertiert, damit das Modell richtig orientiert ist
+            vertices[i, 0] = x
+            vertices[i, 1] = height - 1 - y
+            vertices[i, 2] = heightmap[y, x] * scale_z
+
+            # Zwei Dreiecke pro Quadrat, i ist der linke obere Vertex
+            if y < height - 1 and x < width - 1:
+                f = 2 * (y * (width - 1) + x)
+                faces[f, 0] = i
+                faces[f, 1] = i + 1
+                faces[f, 2] = i + width
+                faces[f + 1, 0] = i + 1
+                faces[f + 1, 1] = i + width + 1
+                faces[f + 1, 2] = i + width
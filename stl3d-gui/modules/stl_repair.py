@@ -2,11 +2,25 @@
 Modul zur Reparatur von STL-Dateien für den 3D-Druck
 """
 
+import io
 import os
 import datetime
+import threading
+import contextlib
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, as_completed
 import numpy as np
 import trimesh
 from utils.file_utils import ensure_directory_exists
+from utils.mesh_utils import read_binary_stl
+
+# Maximale Anzahl zwischengespeicherter Validierungsergebnisse
+VALIDATION_CACHE_SIZE = 5
+
+# Schlüssel (Pfad, Änderungszeit, Größe); zuletzt verwendete Einträge stehen am Ende
+VALIDATION_CACHE = OrderedDict()
+VALIDATION_CACHE_LOCK = threading.Lock()
 
 def create_output_dir(script_name="stl-repair"):
     """
@@ -22,6 +36,176 @@ def create_output_dir(script_name="stl-repair"):
     ensure_directory_exists(output_dir)
     return output_dir
 
+def load_stl(file_path, process=True):
+    """
+    Lädt eine STL-Datei als Trimesh-Objekt.
+    
+    Binäre STL-Dateien werden direkt per Speicherabbildung gelesen, alle anderen
+    (z. B. ASCII-STL) über den allgemeinen Loader von trimesh.
+    
+    Args:
+        file_path: Pfad zur STL-Datei
+        process: Wenn True, werden Vertices beim Laden zusammengeführt und
+                 ungültige Werte entfernt
+        
+    Returns:
+        Das geladene Trimesh-Objekt
+    """
+    data = read_binary_stl(file_path)
+    if data is None:
+        return trimesh.load_mesh(file_path, process=process, skip_materials=True, force='mesh')
+
+    vertices, face_normals = data
+    faces = np.arange(len(vertices), dtype=np.int64).reshape(-1, 3)
+    return trimesh.Trimesh(vertices=vertices, faces=faces, face_normals=face_normals, process=process)
+
+def count_duplicate_faces(faces):
+    """
+    Zählt Flächen, die dieselben drei Vertices wie eine andere Fläche verwenden.
+    
+    Args:
+        faces: (N, 3)-Array der Vertexindizes
+        
+    Returns:
+        Anzahl der doppelten Flächen
+    """
+    if len(faces) == 0:
+        return 0
+
+    # Jede Zeile unabhängig von der Reihenfolge der Vertices auf einen Schlüssel
+    # abbilden, sortieren und gleiche Nachbarn zählen
+    keys = np.sort(trimesh.grouping.hashable_rows(np.sort(faces, axis=1)))
+    return int(np.count_nonzero(keys[1:] == keys[:-1]))
+
+def merge_duplicate_vertices(mesh_data):
+    """
+    Führt Vertices mit gleicher Position zusammen, wie
+    Trimesh.merge_vertices(merge_norm=True).
+    
+    Die Positionen werden mit derselben Genauigkeit (tol.merge) auf Ganzzahlen
+    gerundet, aber per lexsort über die drei Spalten statt über eine
+    Byte-Ansicht der Zeilen sortiert. Das Ergebnis ist identisch: unbenutzte
+    Vertices fallen weg, und die verbleibenden behalten die Reihenfolge
+    ihres ersten Auftretens. Vertexnormalen werden wie bei merge_norm=True
+    nicht unterschieden; STL-Dateien enthalten ohnehin keine.
+    
+    Args:
+        mesh_data: Das zu bearbeitende Trimesh-Objekt (wird direkt verändert)
+    """
+    # UV-Koordinaten berücksichtigt nur trimesh selbst
+    if mesh_data.visual.kind == "texture":
+        mesh_data.merge_vertices(merge_norm=True)
+        return
+
+    vertex_count = len(mesh_data.vertices)
+    if vertex_count == 0:
+        return
+
+    if len(mesh_data.faces) > 0:
+        referenced = np.zeros(vertex_count, dtype=bool)
+        referenced[mesh_data.faces] = True
+        referenced_index = np.nonzero(referenced)[0]
+    else:
+        referenced = np.ones(vertex_count, dtype=bool)
+        referenced_index = np.arange(vertex_count)
+
+    digits = trimesh.util.decimal_to_digits(trimesh.tol.merge)
+    keys = (mesh_data.vertices[referenced_index] * (10 ** digits)).round().astype(np.int64)
+
+    # Stabil sortieren: innerhalb gleicher Positionen steht das erste Auftreten vorn
+    order = np.lexsort(keys.T[::-1])
+    sorted_keys = keys[order]
+    group_start = np.ones(len(order), dtype=bool)
+    group_start[1:] = np.any(sorted_keys[1:] != sorted_keys[:-1], axis=1)
+    group = np.cumsum(group_start) - 1
+
+    # Gruppen nach erstem Auftreten nummerieren
+    first = order[group_start]
+    by_occurrence = np.argsort(first)
+    new_index = np.empty(len(first), dtype=np.int64)
+    new_index[by_occurrence] = np.arange(len(first))
+
+    inverse = np.zeros(vertex_count, dtype=np.int64)
+    inverse[referenced_index[order]] = new_index[group]
+    mesh_data.update_vertices(mask=referenced_index[first[by_occurrence]], inverse=inverse)
+
+def extend_boundary_paths(paths, edge_targets, edge_starts):
+    """
+    Verlängert Pfade entlang der Randkanten um jeweils einen Vertex.
+    
+    Args:
+        paths: (P, k)-Array von Vertexfolgen
+        edge_targets: Endvertices der nach Startvertex sortierten Randkanten
+        edge_starts: Index der ersten Randkante je Startvertex (Länge V + 1)
+        
+    Returns:
+        (Q, k + 1)-Array aller Verlängerungen
+    """
+    last = paths[:, -1]
+    counts = edge_starts[last + 1] - edge_starts[last]
+    offsets = np.cumsum(counts) - counts
+    edge_index = np.repeat(edge_starts[last] - offsets, counts) + np.arange(counts.sum())
+    return np.column_stack((np.repeat(paths, counts, axis=0), edge_targets[edge_index]))
+
+def fill_small_holes(mesh_data):
+    """
+    Schließt Löcher aus drei oder vier Randkanten direkt auf den Kantenarrays.
+    
+    Findet die Randschleifen durch vektorisiertes Verfolgen der gerichteten
+    Randkanten statt wie Trimesh.fill_holes über einen networkx-Graphen. Neue
+    Flächen werden entgegen der Randrichtung orientiert, passend zu den
+    angrenzenden Flächen. Löcher mit inkonsistent orientiertem Rand findet
+    das Verfolgen nicht; ist das Mesh danach noch offen, wird daher
+    Trimesh.fill_holes für die verbleibenden Löcher aufgerufen.
+    
+    Args:
+        mesh_data: Das zu reparierende Trimesh-Objekt (wird direkt verändert)
+        
+    Returns:
+        True, wenn das Mesh danach wasserdicht ist
+    """
+    if len(mesh_data.faces) < 3:
+        return False
+    if mesh_data.is_watertight:
+        return True
+
+    # Kanten, die nur einmal vorkommen, liegen auf dem Rand; mesh.edges behält
+    # die Richtung der zugehörigen Fläche
+    boundary = mesh_data.edges[trimesh.grouping.group_rows(mesh_data.edges_sorted, require_count=1)]
+    if len(boundary) < 3:
+        return False
+
+    # Randkanten nach Startvertex sortieren, um Nachfolger per Index zu finden
+    boundary = boundary[np.argsort(boundary[:, 0], kind='stable')]
+    edge_starts = np.searchsorted(boundary[:, 0], np.arange(len(mesh_data.vertices) + 1))
+    edge_targets = boundary[:, 1]
+
+    # Pfade a -> b -> c -> d; jede Schleife wird nur ab ihrem kleinsten Vertex erfasst
+    paths = boundary[boundary[:, 0] < boundary[:, 1]]
+    paths = extend_boundary_paths(paths, edge_targets, edge_starts)
+    paths = paths[paths[:, 0] < paths[:, 2]]
+    paths = extend_boundary_paths(paths, edge_targets, edge_starts)
+    a, b, c, d = paths.T
+
+    triangles = paths[d == a]
+
+    paths = paths[(d > a) & (d != b)]
+    paths = extend_boundary_paths(paths, edge_targets, edge_starts)
+    quads = paths[paths[:, 4] == paths[:, 0]]
+
+    new_faces = np.vstack((
+        triangles[:, [2, 1, 0]],
+        quads[:, [3, 2, 1]],
+        quads[:, [1, 0, 3]],
+    ))
+    if len(new_faces) > 0:
+        # extend_faces behält die bereits berechneten Flächennormalen
+        mesh_data.extend_faces(new_faces)
+        if mesh_data.is_watertight:
+            return True
+
+    return mesh_data.fill_holes()
+
 def clean_model(mesh_data, verbose=False):
     """
     Säubert das Modell von Artefakten wie Rändern, Rahmen und isolierten Teilen.
@@ -40,77 +224,68 @@ def clean_model(mesh_data, verbose=False):
     original_vertices = len(mesh_data.vertices)
     original_faces = len(mesh_data.faces)
 
-    # 1. Entferne doppelte Vertices und Flächen
-    mesh_data.merge_vertices()
+    # 1. Entferne ungültige Koordinaten, doppelte Vertices und Flächen
+    mesh_data.remove_infinite_values()
+    merge_duplicate_vertices(mesh_data)
     mesh_data.update_faces(mesh_data.unique_faces())
 
-    # 2. Identifiziere zusammenhängende Komponenten
-    components = mesh_data.split(only_watertight=False)
-
-    if len(components) > 1:
-        if verbose:
-            print(f"Modell besteht aus {len(components)} separaten Komponenten")
-
-        # Berechne Volumen/Größe jeder Komponente
-        component_sizes = []
-        for i, comp in enumerate(components):
-            # Verwende Anzahl der Flächen als Maß für die Größe
-            size = len(comp.faces)
-            # Versuche Volumen zu berechnen, wenn möglich
-            volume = 0
-            try:
-                if comp.is_watertight:
-                    volume = comp.volume
-            except:
-                pass
-
-            component_sizes.append((i, size, volume))
-
-            if verbose:
-                print(f"  Komponente {i + 1}: {size} Flächen, Volumen: {volume:.2f}")
-
-        # Sortiere nach Größe (Anzahl der Flächen)
-        component_sizes.sort(key=lambda x: x[1], reverse=True)
-
-        # Identifiziere Hauptkomponente(n) und Rahmen/Artefakte
-        main_components = []
-        artifacts = []
+    # 2. Identifiziere zusammenhängende Komponenten über Labels der Flächen-Adjazenz,
+    # ohne für jede Komponente ein eigenes Mesh zu erzeugen
+    if len(mesh_data.faces) > 0:
+        labels = trimesh.graph.connected_component_labels(mesh_data.face_adjacency,
+                                                          node_count=len(mesh_data.faces))
+    else:
+        labels = np.empty(0, dtype=np.int64)
 
-        # Hauptkomponente ist die größte
-        main_size = component_sizes[0][1]
+    # Verwende Anzahl der Flächen als Maß für die Größe jeder Komponente
+    sizes = np.bincount(labels)
 
-        # Komponenten, die mindestens 20% der Größe der Hauptkomponente haben, werden behalten
+    if len(sizes) > 1:
+        if verbose:
+            print(f"Modell besteht aus {len(sizes)} separaten Komponenten")
+
+            # Teil-Meshes werden nur für die Ausgabe der Volumina erzeugt
+            components = mesh_data.submesh(trimesh.grouping.group(labels), only_watertight=False, repair=True)
+            for i, comp in enumerate(components):
+                # Versuche Volumen zu berechnen, wenn möglich
+                volume = 0
+                try:
+                    if comp.is_watertight:
+                        volume = comp.volume
+                except:
+                    pass
+
+                print(f"  Komponente {i + 1}: {sizes[i]} Flächen, Volumen: {volume:.2f}")
+
+        # Hauptkomponente ist die größte; Komponenten, die mindestens 20% ihrer Größe
+        # haben, werden behalten, der Rest gilt als Rahmen/Artefakt
+        main_size = sizes.max()
         threshold = main_size * 0.2
 
-        for i, size, volume in component_sizes:
-            if size >= threshold:
-                main_components.append(i)
-            else:
-                artifacts.append(i)
+        keep = sizes >= threshold
+        num_main = int(np.count_nonzero(keep))
 
         if verbose:
-            print(f"Identifizierte {len(main_components)} Hauptkomponente(n) und {len(artifacts)} Artefakte/Rahmen")
+            print(f"Identifizierte {num_main} Hauptkomponente(n) und {len(sizes) - num_main} Artefakte/Rahmen")
 
-        # Behalte nur die Hauptkomponenten
-        if len(main_components) < len(components):
-            # Erstelle ein neues Mesh aus den Hauptkomponenten
-            kept_components = [components[i] for i in main_components]
+        # Behalte nur die Flächen der Hauptkomponenten, ohne Teil-Meshes zu erzeugen
+        if num_main < len(sizes):
+            mesh_data.update_faces(keep[labels])
+            mesh_data.remove_unreferenced_vertices()
 
-            if len(kept_components) == 1:
-                # Nur eine Hauptkomponente
-                mesh_data = kept_components[0]
-            else:
-                # Mehrere Hauptkomponenten - vereinige sie
-                mesh_data = trimesh.util.concatenate(kept_components)
+            # Kleine Löcher der verbleibenden Komponenten schließen
+            fill_small_holes(mesh_data)
 
             if verbose:
                 print(f"Artefakte/Rahmen entfernt. Neue Mesh-Größe: {len(mesh_data.faces)} Flächen")
 
     # 3. Entferne degenerierte Dreiecke (Dreiecke mit Null-Fläche)
     if len(mesh_data.faces) > 0:
-        # Identifiziere degenerierte Dreiecke (mit Null-Fläche)
-        areas = trimesh.triangles.area(mesh_data.triangles)
-        valid_faces = areas > 1e-8  # Toleranz für Flächenberechnung
+        # Identifiziere degenerierte Dreiecke (mit Null-Fläche): Fläche = |Kreuzprodukt| / 2,
+        # daher wird das Betragsquadrat ohne Wurzel mit (2 * Toleranz)^2 verglichen
+        triangles = mesh_data.triangles
+        cross = np.cross(triangles[:, 1] - triangles[:, 0], triangles[:, 2] - triangles[:, 0])
+        valid_faces = np.einsum('ij,ij->i', cross, cross) > (2 * 1e-8) ** 2  # Toleranz für Flächenberechnung
 
         if not np.all(valid_faces):
             if verbose:
@@ -145,49 +320,50 @@ def make_watertight(mesh_data, max_hole_size=None, timeout=30, verbose=False):
     start_time = time.time()
 
     # 1. Entferne doppelte Vertices und Flächen
-    mesh_data.merge_vertices()
+    merge_duplicate_vertices(mesh_data)
     mesh_data.update_faces(mesh_data.unique_faces())
 
     # 2. Versuche zunächst, Löcher mit Trimesh zu füllen
-    mesh_data.fill_holes()
+    fill_small_holes(mesh_data)
 
-    # Prüfe, ob das Mesh bereits wasserdicht ist
-    if mesh_data.is_watertight:
+    # Prüfe, ob das Mesh bereits wasserdicht ist (Ergebnis wird nach jeder Stufe aktualisiert)
+    is_watertight = mesh_data.is_watertight
+    if is_watertight:
         if verbose:
             print("Mesh ist nach dem Löcher-Füllen bereits wasserdicht!")
         return mesh_data
 
-    # 3. Versuche vereinfachte Reparatur, wenn das Mesh noch nicht wasserdicht ist
-    if not mesh_data.is_watertight:
-        if verbose:
-            print("Versuche vereinfachte Reparatur...")
+    # 3. Versuche vereinfachte Reparatur, da das Mesh noch nicht wasserdicht ist
+    if verbose:
+        print("Versuche vereinfachte Reparatur...")
 
-        # Entferne ungenutzte Vertices und isolierte Komponenten
-        mesh_data.remove_unreferenced_vertices()
+    # Entferne ungenutzte Vertices und isolierte Komponenten
+    mesh_data.remove_unreferenced_vertices()
 
-        # Extrahiere die größte zusammenhängende Komponente
-        components = mesh_data.split(only_watertight=False)
-        if len(components) > 1:
-            if verbose:
-                print(f"Mesh besteht aus {len(components)} getrennten Komponenten")
-            # Wähle die größte Komponente
-            largest_component = sorted(components, key=lambda m: len(m.faces), reverse=True)[0]
-            mesh_data = largest_component
-            if verbose:
-                print(f"Größte Komponente ausgewählt: {len(mesh_data.faces)} Flächen")
+    # Extrahiere die größte zusammenhängende Komponente
+    components = mesh_data.split(only_watertight=False)
+    if len(components) > 1:
+        if verbose:
+            print(f"Mesh besteht aus {len(components)} getrennten Komponenten")
+        # Wähle die größte Komponente
+        largest_component = max(components, key=lambda m: len(m.faces))
+        mesh_data = largest_component
+        if verbose:
+            print(f"Größte Komponente ausgewählt: {len(mesh_data.faces)} Flächen")
 
-        # Normalen korrigieren
-        mesh_data.fix_normals()
+    # Normalen korrigieren
+    mesh_data.fix_normals()
 
-        # Prüfe erneut, ob das Mesh wasserdicht ist
-        if mesh_data.is_watertight:
-            if verbose:
-                print("Mesh ist nach vereinfachter Reparatur wasserdicht!")
-            return mesh_data
+    # Prüfe erneut, ob das Mesh wasserdicht ist
+    is_watertight = mesh_data.is_watertight
+    if is_watertight:
+        if verbose:
+            print("Mesh ist nach vereinfachter Reparatur wasserdicht!")
+        return mesh_data
 
     # 4. Versuche eine Konvexhülle, wenn die Zeit es erlaubt
     # Dies ist schneller als Voxelisierung und funktioniert in den meisten Fällen
-    if not mesh_data.is_watertight and (time.time() - start_time) < timeout:
+    if not is_watertight and (time.time() - start_time) < timeout:
         try:
             if verbose:
                 print("Erstelle Konvexhülle...")
@@ -202,17 +378,25 @@ def make_watertight(mesh_data, max_hole_size=None, timeout=30, verbose=False):
 
     # 5. Wenn die Zeit es erlaubt und die Konvexhülle fehlgeschlagen ist,
     # versuche als letzte Option eine Voxelisierung
-    if not mesh_data.is_watertight and (time.time() - start_time) < timeout:
+    if not is_watertight and (time.time() - start_time) < timeout:
         try:
             if verbose:
                 print("Erstelle Voxel-Darstellung (kann einige Sekunden dauern)...")
             # Verwende eine gröbere Voxel-Auflösung für schnellere Verarbeitung
             # Berechne eine vernünftige Voxelgröße basierend auf der Modellgröße
-            voxel_size = max(mesh_data.bounding_box.extents) / 50.0
+            voxel_size = float(np.ptp(mesh_data.bounds, axis=0).max()) / 50.0
             if verbose:
                 print(f"Verwende Voxelgröße: {voxel_size}")
 
-            voxel = mesh_data.voxelized(pitch=voxel_size)
+            # Mit Embree ist das Abtasten per Strahlen deutlich schneller als die
+            # rekursive Unterteilung der Dreiecke
+            if trimesh.ray.has_embree:
+                try:
+                    voxel = mesh_data.voxelized(pitch=voxel_size, method='ray')
+                except Exception:
+                    voxel = mesh_data.voxelized(pitch=voxel_size, method='subdivide')
+            else:
+                voxel = mesh_data.voxelized(pitch=voxel_size, method='subdivide')
 
             if verbose:
                 print("Erzeuge Mesh aus Voxel-Darstellung...")
@@ -236,46 +420,68 @@ def make_watertight(mesh_data, max_hole_size=None, timeout=30, verbose=False):
         print("Konnte keine vollständig wasserdichte Version erstellen. Gebe bestmögliches Mesh zurück.")
     return mesh_data
 
-def fix_stl(input_file, output_path=None, verbose=False, aggressive=True, clean_model_flag=True, 
-           max_iterations=2, timeout=30, use_timestamp=False):
+def build_output_path(input_file, output_path=None, use_timestamp=False):
     """
-    Lädt eine STL-Datei, repariert sie und speichert die reparierte Version.
+    Bestimmt den Pfad der reparierten STL-Datei im Ausgabeverzeichnis.
     
     Args:
         input_file: Pfad zur Eingabe-STL-Datei
-        output_path: Pfad zur Ausgabe-STL-Datei (None für automatische Benennung)
-        verbose: Wenn True, werden detaillierte Informationen ausgegeben
-        aggressive: Wenn True, werden aggressive Reparaturmethoden angewendet
-        clean_model_flag: Wenn True, werden Rahmen und Artefakte entfernt
-        max_iterations: Maximale Anzahl von Reparaturversuchen
-        timeout: Maximale Zeit in Sekunden für rechenintensive Operationen
-        use_timestamp: Wenn True, wird der Ausgabedatei ein Zeitstempel hinzugefügt
+        output_path: Gewünschter Name der Ausgabedatei (None für automatische Benennung)
+        use_timestamp: Wenn True, wird dem Dateinamen ein Zeitstempel hinzugefügt
         
     Returns:
-        Der vollständige Pfad zur reparierten STL-Datei
+        Pfad zur Ausgabedatei
     """
     # Ausgabeverzeichnis erstellen
     output_dir = create_output_dir()
     
-    # Wenn kein Ausgabepfad angegeben ist, erstelle einen Standard-Ausgabepfad
+    # Dateinamen bestimmen; ohne Ausgabepfad wird ein Standardname verwendet
     if output_path is None:
-        base_name = os.path.splitext(os.path.basename(input_file))[0]
-        output_path = os.path.join(output_dir, f"{base_name}_repaired.stl")
+        base_name, ext = os.path.splitext(os.path.basename(input_file))[0] + "_repaired", ".stl"
     else:
-        output_path = os.path.join(output_dir, os.path.basename(output_path))
+        base_name, ext = os.path.splitext(os.path.basename(output_path))
 
     # Zeitstempel einfügen, falls gewünscht
     if use_timestamp:
         timestamp = datetime.datetime.now().strftime("%Y-%m-%d-%H-%M-%S")
-        base_name, ext = os.path.splitext(output_path)
-        output_path = f"{base_name}_{timestamp}{ext}"
+        base_name = f"{base_name}_{timestamp}"
+
+    return os.path.join(output_dir, base_name + ext)
+
+def fix_stl(input_file, output_path=None, verbose=False, aggressive=True, clean_model_flag=True, 
+           max_iterations=2, timeout=30, use_timestamp=False, return_stats=False):
+    """
+    Lädt eine STL-Datei, repariert sie und speichert die reparierte Version.
+    
+    Args:
+        input_file: Pfad zur Eingabe-STL-Datei
+        output_path: Pfad zur Ausgabe-STL-Datei (None für automatische Benennung)
+        verbose: Wenn True, werden detaillierte Informationen ausgegeben
+        aggressive: Wenn True, werden aggressive Reparaturmethoden angewendet
+        clean_model_flag: Wenn True, werden Rahmen und Artefakte entfernt
+        max_iterations: Maximale Anzahl von Reparaturversuchen
+        timeout: Maximale Zeit in Sekunden für rechenintensive Operationen
+        use_timestamp: Wenn True, wird der Ausgabedatei ein Zeitstempel hinzugefügt
+        return_stats: Wenn True, werden zusätzlich die Statistiken des reparierten
+                      Meshes zurückgegeben und im Validierungs-Cache abgelegt
+        
+    Returns:
+        Der vollständige Pfad zur reparierten STL-Datei, bei return_stats ein
+        Tupel (Pfad, Statistik-Dictionary wie bei validate_stl mit full_stats=False)
+    """
+    output_path = build_output_path(input_file, output_path, use_timestamp)
 
     if verbose:
         print(f"Lade STL-Datei: {input_file}")
 
     try:
-        # Lade die Datei mit trimesh für erweiterte Reparaturoptionen
-        mesh_data = trimesh.load_mesh(input_file)
+        # Lade die Datei mit trimesh für erweiterte Reparaturoptionen; die Bereinigung
+        # beim Laden entfällt, da clean_model die Vertices ohnehin zusammenführt
+        mesh_data = load_stl(input_file, process=False)
+
+        # Diagnose und Reparatur ohne clean_model benötigen zusammengeführte Vertices
+        if verbose or not clean_model_flag:
+            mesh_data.process()
 
         if verbose:
             print("Original-Mesh geladen.")
@@ -292,7 +498,7 @@ def fix_stl(input_file, output_path=None, verbose=False, aggressive=True, clean_
             if mesh_data.is_empty:
                 print("PROBLEM: Mesh ist leer")
 
-            duplicate_faces = len(mesh_data.faces) - len(np.unique(mesh_data.faces, axis=0))
+            duplicate_faces = count_duplicate_faces(mesh_data.faces)
             if duplicate_faces > 0:
                 print(f"PROBLEM: {duplicate_faces} doppelte Flächen gefunden")
 
@@ -310,45 +516,57 @@ def fix_stl(input_file, output_path=None, verbose=False, aggressive=True, clean_
         iteration = 0
         repaired_mesh = mesh_data
 
-        while (not repaired_mesh.is_watertight or not repaired_mesh.is_winding_consistent) and iteration < max_iterations:
+        # Eigenschaften einmal bestimmen und in Schleife und Auswertung wiederverwenden
+        is_watertight = repaired_mesh.is_watertight
+        needs_repair = not is_watertight or not repaired_mesh.is_winding_consistent
+
+        while needs_repair and iteration < max_iterations:
             iteration += 1
             if verbose:
                 print(f"Reparaturdurchlauf {iteration}/{max_iterations}...")
 
-            # Grundlegende Reparatur
-            # 1. Entferne doppelte Vertices
-            repaired_mesh.merge_vertices()
-
-            # 2. Entferne doppelte Flächen
-            repaired_mesh.update_faces(repaired_mesh.unique_faces())
+            # Zustand vor dem Durchlauf merken, um wirkungslose Wiederholungen zu erkennen
+            previous_faces = repaired_mesh.faces.copy()
+            previous_vertex_count = len(repaired_mesh.vertices)
 
-            # 3. Fülle Löcher
-            repaired_mesh.fill_holes()
-
-            # 4. Korrigiere Flächenorientierungen
-            repaired_mesh.fix_normals()
-
-            # 5. Führe zusätzliche Reparaturen durch
+            # Grundlegende Reparatur
+            # 1. Entferne doppelte Vertices, doppelte und entartete Flächen und
+            #    korrigiere die Flächenorientierungen
             repaired_mesh = repaired_mesh.process(validate=True)
 
+            # 2. Fülle Löcher
+            fill_small_holes(repaired_mesh)
+
             # Prüfe, ob das Mesh bereits wasserdicht ist
-            if repaired_mesh.is_watertight:
+            is_watertight = repaired_mesh.is_watertight
+            if is_watertight:
+                # process() korrigiert eine nach innen zeigende Orientierung nur bei
+                # wasserdichten Meshes; das Mesh ist aber erst nach dem Füllen geschlossen
+                repaired_mesh.fix_normals()
                 if verbose:
                     print("Mesh ist bereits nach Standard-Reparatur wasserdicht!")
                 break
 
+            # Hat der Durchlauf nichts verändert, liefern weitere Durchläufe dasselbe Ergebnis
+            if (len(repaired_mesh.vertices) == previous_vertex_count and
+                    np.array_equal(repaired_mesh.faces, previous_faces)):
+                if verbose:
+                    print("Standard-Reparatur bewirkt keine weiteren Änderungen.")
+                break
+
         # Aggressive Reparatur, wenn gewünscht und noch nicht wasserdicht
-        if aggressive and not repaired_mesh.is_watertight:
+        if aggressive and not is_watertight:
             if verbose:
                 print("Starte aggressive Reparatur zum Erzwingen der Wasserdichtigkeit...")
             repaired_mesh = make_watertight(repaired_mesh, timeout=timeout, verbose=verbose)
+            is_watertight = repaired_mesh.is_watertight
 
         if verbose:
             print("Reparatur abgeschlossen.")
             print(f"Neue Vertices: {len(repaired_mesh.vertices)}")
             print(f"Neue Faces: {len(repaired_mesh.faces)}")
 
-            if repaired_mesh.is_watertight:
+            if is_watertight:
                 print("SUCCESS: Mesh ist jetzt wasserdicht")
             else:
                 print("WARNUNG: Mesh ist immer noch nicht vollständig wasserdicht")
@@ -360,59 +578,314 @@ def fix_stl(input_file, output_path=None, verbose=False, aggressive=True, clean_
             else:
                 print("WARNUNG: Flächenorientierung ist immer noch inkonsistent")
 
+        # Ein geschlossenes Mesh muss ein positives Volumen haben, sonst zeigen die
+        # Normalen nach innen
+        if is_watertight and repaired_mesh.volume < 0:
+            if verbose:
+                print("Negatives Volumen: Flächenorientierung wird umgekehrt.")
+            repaired_mesh.invert()
+
         # Exportiere das reparierte Mesh
         repaired_mesh.export(output_path)
 
         if verbose:
             print(f"Repariertes Mesh gespeichert als: {output_path}")
 
+        if return_stats:
+            # Das Mesh liegt bereits im Speicher; erneutes Laden der Datei entfällt
+            is_valid, stats = mesh_stats(repaired_mesh, full_stats=False)
+            store_validation(output_path, is_valid, stats)
+            return output_path, stats
+
         return output_path
 
     except Exception as e:
         print(f"Fehler beim Verarbeiten der STL-Datei: {str(e)}")
         raise
 
-def validate_stl(file_path, verbose=False):
+def batch_output_names(input_files):
+    """
+    Bestimmt eindeutige Namen der reparierten Dateien für eine Stapelreparatur.
+    
+    Alle Ergebnisse landen im selben Ausgabeverzeichnis; Dateien mit gleichem
+    Namen aus verschiedenen Verzeichnissen erhalten daher eine fortlaufende
+    Nummer (Groß-/Kleinschreibung wird dabei nicht unterschieden).
+    
+    Args:
+        input_files: Liste der Pfade zu den Eingabe-STL-Dateien
+        
+    Returns:
+        Liste der Dateinamen in der Reihenfolge der Eingabe
+    """
+    used = set()
+    names = []
+    for input_file in input_files:
+        base_name = os.path.splitext(os.path.basename(input_file))[0] + "_repaired"
+        name = base_name
+        number = 2
+        while name.lower() in used:
+            name = f"{base_name}_{number}"
+            number += 1
+        used.add(name.lower())
+        names.append(f"{name}.stl")
+    return names
+
+def repair_batch_job(input_file, output_path, options):
+    """
+    Repariert eine Datei im Worker-Prozess und sammelt ihre Ausgaben.
+    
+    Args:
+        input_file: Pfad zur Eingabe-STL-Datei
+        output_path: Name der Ausgabedatei
+        options: Dictionary mit weiteren Parametern für fix_stl
+        
+    Returns:
+        Tupel (Pfad oder None bei Fehlern, Statistik-Dictionary, Ausgabetext)
+    """
+    buffer = io.StringIO()
+    with contextlib.redirect_stdout(buffer):
+        try:
+            result_path, stats = fix_stl(input_file, output_path, return_stats=True, **options)
+        except Exception as e:
+            print(f"Fehler beim Reparieren von {input_file}: {str(e)}")
+            return None, {}, buffer.getvalue()
+
+    return result_path, stats, buffer.getvalue()
+
+def fix_stl_batch(input_files, max_workers=None, on_result=None, **kwargs):
+    """
+    Repariert mehrere STL-Dateien parallel in eigenen Prozessen.
+    
+    Jede Datei wird vollständig (Laden, Reparatur, Export) in einem
+    Worker-Prozess bearbeitet; zwischen den Prozessen werden nur Pfade,
+    Statistiken und die gesammelten Ausgaben ausgetauscht. Die Prozesse werden
+    neu gestartet statt geforkt, da der aufrufende Prozess (die GUI) Threads
+    besitzt. Die Statistiken der Ergebnisse werden im Validierungs-Cache abgelegt.
+    
+    Args:
+        input_files: Liste der Pfade zu den Eingabe-STL-Dateien
+        max_workers: Anzahl der Worker-Prozesse (None = Anzahl der CPU-Kerne,
+                     höchstens eine pro Datei)
+        on_result: Funktion on_result(index, input_file, result_path, stats, log),
+                   die im aufrufenden Thread nach jeder fertigen Datei aufgerufen
+                   wird; ohne Funktion werden die Ausgaben mit print() ausgegeben
+        **kwargs: Weitere Parameter für fix_stl (außer output_path und return_stats)
+        
+    Returns:
+        Liste der Pfade zu den reparierten Dateien in der Reihenfolge der
+        Eingabe; None für Dateien, deren Reparatur fehlgeschlagen ist
+    """
+    results = [None] * len(input_files)
+    if not input_files:
+        return results
+
+    if max_workers is None:
+        max_workers = min(len(input_files), os.cpu_count() or 1)
+
+    output_names = batch_output_names(input_files)
+    context = multiprocessing.get_context("spawn")
+
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=context) as executor:
+        futures = {
+            executor.submit(repair_batch_job, input_file, output_name, kwargs): index
+            for index, (input_file, output_name) in enumerate(zip(input_files, output_names))
+        }
+
+        for future in as_completed(futures):
+            index = futures[future]
+            input_file = input_files[index]
+            try:
+                result_path, stats, log = future.result()
+            except Exception as e:
+                # z. B. abgestürzter Worker-Prozess
+                result_path, stats, log = None, {}, f"Fehler beim Reparieren von {input_file}: {str(e)}\n"
+
+            if result_path is not None:
+                store_validation(result_path, is_printable(stats), stats)
+            results[index] = result_path
+
+            if on_result is None:
+                print(log, end="")
+            else:
+                on_result(index, input_file, result_path, stats, log)
+
+    return results
+
+def mesh_stats(mesh_data, full_stats=True):
+    """
+    Bestimmt die Kennwerte eines Meshes für die Druckbarkeitsprüfung.
+    
+    Args:
+        mesh_data: Das zu prüfende Trimesh-Objekt
+        full_stats: Wenn True, werden auch Volumen und Euler-Zahl berechnet
+        
+    Returns:
+        Tupel (bool, dict) - True wenn gültig, sowie ein Dictionary mit Statistiken
+    """
+    is_watertight = mesh_data.is_watertight
+    stats = {
+        "vertices": len(mesh_data.vertices),
+        "faces": len(mesh_data.faces),
+        "is_watertight": is_watertight,
+        "is_winding_consistent": mesh_data.is_winding_consistent,
+        "is_empty": mesh_data.is_empty,
+    }
+
+    # Volumen und Euler-Zahl (benötigt alle eindeutigen Kanten) nur bei Bedarf
+    if full_stats:
+        stats["volume"] = mesh_data.volume if is_watertight else "N/A"
+        stats["euler_number"] = mesh_data.euler_number
+
+    return is_printable(stats), stats
+
+def is_printable(stats):
+    """
+    Bildet das Gesamturteil einer Validierung aus ihren Statistiken.
+    
+    Args:
+        stats: Dictionary mit Statistiken aus mesh_stats()
+        
+    Returns:
+        True, wenn das Mesh wasserdicht, konsistent orientiert und nicht leer ist
+    """
+    return bool(stats["is_watertight"] and
+                stats["is_winding_consistent"] and
+                not stats["is_empty"])
+
+def validation_cache_key(file_path):
+    """
+    Bildet den Cache-Schlüssel einer STL-Datei aus Pfad, Änderungszeit und Größe.
+    
+    Args:
+        file_path: Pfad zur STL-Datei
+        
+    Returns:
+        Tupel (absoluter Pfad, Änderungszeit in ns, Größe in Bytes)
+    """
+    stat = os.stat(file_path)
+    return os.path.abspath(file_path), stat.st_mtime_ns, stat.st_size
+
+def store_validation(file_path, is_valid, stats):
+    """
+    Legt ein Validierungsergebnis im Cache ab und entfernt die ältesten Einträge.
+    
+    Args:
+        file_path: Pfad zur STL-Datei
+        is_valid: Gesamturteil der Validierung
+        stats: Dictionary mit Statistiken
+    """
+    key = validation_cache_key(file_path)
+
+    with VALIDATION_CACHE_LOCK:
+        VALIDATION_CACHE[key] = (is_valid, stats)
+        VALIDATION_CACHE.move_to_end(key)
+        while len(VALIDATION_CACHE) > VALIDATION_CACHE_SIZE:
+            VALIDATION_CACHE.popitem(last=False)
+
+def lookup_validation(file_path, full_stats=False):
+    """
+    Liefert ein zwischengespeichertes Validierungsergebnis, ohne die Datei zu laden.
+    
+    Args:
+        file_path: Pfad zur STL-Datei
+        full_stats: Wenn True, zählen nur Einträge mit Volumen und Euler-Zahl
+        
+    Returns:
+        Tupel (bool, dict) wie bei validate_stl oder None, wenn kein passender
+        Eintrag vorliegt (auch wenn die Datei nicht existiert)
+    """
+    try:
+        key = validation_cache_key(file_path)
+    except OSError:
+        return None
+
+    with VALIDATION_CACHE_LOCK:
+        cached = VALIDATION_CACHE.get(key)
+        if cached is None or (full_stats and "euler_number" not in cached[1]):
+            return None
+        VALIDATION_CACHE.move_to_end(key)
+        is_valid, stats = cached
+
+    return is_valid, dict(stats)
+
+def clear_validation_cache():
+    """Verwirft alle zwischengespeicherten Validierungsergebnisse"""
+    with VALIDATION_CACHE_LOCK:
+        VALIDATION_CACHE.clear()
+
+def print_validation(file_path, is_valid, stats):
+    """
+    Gibt das Ergebnis einer Validierung ausführlich aus.
+    
+    Args:
+        file_path: Pfad zur STL-Datei
+        is_valid: Gesamturteil der Validierung
+        stats: Dictionary mit Statistiken (mit Volumen und Euler-Zahl)
+    """
+    print(f"STL-Validierung für {file_path}:")
+    print(f"Vertices: {stats['vertices']}")
+    print(f"Faces: {stats['faces']}")
+    print(f"Ist wasserdicht: {stats['is_watertight']}")
+    print(f"Hat konsistente Winding-Reihenfolge: {stats['is_winding_consistent']}")
+    print(f"Ist leer: {stats['is_empty']}")
+    print(f"Volumen: {stats['volume']}")
+    print(f"Euler-Zahl: {stats['euler_number']}")
+    print(f"Gesamturteil: {'Gültig' if is_valid else 'Ungültig'} für 3D-Druck")
+
+def validate_stl(file_path, verbose=False, full_stats=True):
     """
     Überprüft, ob die STL-Datei für den 3D-Druck geeignet ist
     
     Args:
         file_path: Pfad zur STL-Datei
         verbose: Wenn True, werden detaillierte Informationen ausgegeben
+        full_stats: Wenn True, werden auch Volumen und Euler-Zahl berechnet
+                    (bei verbose immer)
         
     Returns:
         Tupel (bool, dict) - True wenn gültig, sowie ein Dictionary mit Statistiken
     """
     try:
-        mesh_data = trimesh.load_mesh(file_path)
-
-        stats = {
-            "vertices": len(mesh_data.vertices),
-            "faces": len(mesh_data.faces),
-            "is_watertight": mesh_data.is_watertight,
-            "is_winding_consistent": mesh_data.is_winding_consistent,
-            "is_empty": mesh_data.is_empty,
-            "volume": mesh_data.volume if mesh_data.is_watertight else "N/A",
-            "euler_number": mesh_data.euler_number,
-        }
+        mesh_data = load_stl(file_path)
 
-        is_valid = (mesh_data.is_watertight and
-                   mesh_data.is_winding_consistent and
-                   not mesh_data.is_empty)
+        is_valid, stats = mesh_stats(mesh_data, full_stats or verbose)
 
         if verbose:
-            print(f"STL-Validierung für {file_path}:")
-            print(f"Vertices: {stats['vertices']}")
-            print(f"Faces: {stats['faces']}")
-            print(f"Ist wasserdicht: {stats['is_watertight']}")
-            print(f"Hat konsistente Winding-Reihenfolge: {stats['is_winding_consistent']}")
-            print(f"Ist leer: {stats['is_empty']}")
-            print(f"Volumen: {stats['volume']}")
-            print(f"Euler-Zahl: {stats['euler_number']}")
-            print(f"Gesamturteil: {'Gültig' if is_valid else 'Ungültig'} für 3D-Druck")
+            print_validation(file_path, is_valid, stats)
 
         return is_valid, stats
 
     except Exception as e:
         print(f"Fehler beim Validieren der STL-Datei: {str(e)}")
         return False, {}
+
+def cached_validate_stl(file_path, verbose=False, full_stats=True):
+    """
+    Wie validate_stl, verwendet aber Ergebnisse für unveränderte Dateien wieder.
+    
+    Ein Eintrag gilt, solange Pfad, Änderungszeit und Größe der Datei
+    übereinstimmen. Fehlen im Eintrag Volumen und Euler-Zahl, obwohl sie
+    benötigt werden, wird die Datei erneut geprüft.
+    
+    Args:
+        file_path: Pfad zur STL-Datei
+        verbose: Wenn True, werden detaillierte Informationen ausgegeben
+        full_stats: Wenn True, werden auch Volumen und Euler-Zahl benötigt
+                    (bei verbose immer)
+        
+    Returns:
+        Tupel (bool, dict) - True wenn gültig, sowie ein Dictionary mit Statistiken
+    """
+    full_stats = full_stats or verbose
+    cached = lookup_validation(file_path, full_stats)
+
+    if cached is None:
+        is_valid, stats = validate_stl(file_path, verbose, full_stats)
+        if stats:
+            store_validation(file_path, is_valid, stats)
+        return is_valid, stats
+
+    is_valid, stats = cached
+    if verbose:
+        print_validation(file_path, is_valid, stats)
+    return is_valid, stats
@@ -3,10 +3,71 @@ Modul zur Erstellung von 3D-STL-Dateien aus Text
 """
 
 import os
+import sys
+import functools
 import numpy as np
 import trimesh
 from PIL import Image, ImageDraw, ImageFont, ImageOps, ImageFilter
 from utils.file_utils import ensure_directory_exists
+from utils.mesh_utils import write_binary_stl
+
+# Kantenlänge eines Pixels in mm (100 DPI)
+PIXEL_SIZE = 0.254
+
+# Eckpunkte eines Pixel-Quaders relativ zur Pixelposition: obere Ecken
+# (oben links, oben rechts, unten links, unten rechts), danach dieselben auf z=0
+VOXEL_CORNERS = np.array([
+    [0, 0], [PIXEL_SIZE, 0], [0, PIXEL_SIZE], [PIXEL_SIZE, PIXEL_SIZE],
+    [0, 0], [PIXEL_SIZE, 0], [0, PIXEL_SIZE], [PIXEL_SIZE, PIXEL_SIZE],
+])
+
+# Dreiecke eines Pixel-Quaders als Indizes in VOXEL_CORNERS
+VOXEL_FACES = np.array([
+    # Oberseite
+    [0, 1, 2], [2, 1, 3],
+    # Unterseite
+    [4, 6, 5], [6, 7, 5],
+    # Vorne
+    [0, 4, 1], [1, 4, 5],
+    # Rechts
+    [1, 5, 3], [3, 5, 7],
+    # Hinten
+    [3, 7, 2], [2, 7, 6],
+    # Links
+    [2, 6, 0], [0, 6, 4],
+], dtype=np.int32)
+
+# Anzahl der Boxfilter-Durchläufe von ImageFilter.GaussianBlur (bestimmt die
+# Reichweite der Weichzeichnung um den Text)
+BLUR_MARGIN_PASSES = 3
+
+# Fallback-Schriftarten je Betriebssystem, in der Reihenfolge der Bevorzugung
+FONT_FALLBACKS = {
+    'darwin': (  # macOS
+        '/Library/Fonts/Arial.ttf',
+        '/System/Library/Fonts/Helvetica.ttc',
+        '/System/Library/Fonts/Times.ttc'
+    ),
+    'win32': (  # Windows
+        'C:\\Windows\\Fonts\\arial.ttf',
+        'C:\\Windows\\Fonts\\times.ttf',
+        'C:\\Windows\\Fonts\\calibri.ttf'
+    ),
+    'linux': (  # Linux und andere
+        '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf',
+        '/usr/share/fonts/TTF/DejaVuSans.ttf',
+        '/usr/share/fonts/truetype/freefont/FreeSans.ttf'
+    ),
+}
+
+# Auf diesem System vorhandene Fallback-Schriftarten (einmalig beim Import ermittelt)
+FALLBACK_FONT_PATHS = tuple(
+    path for path in FONT_FALLBACKS.get(sys.platform, FONT_FALLBACKS['linux'])
+    if os.path.exists(path)
+)
+
+# Zeichenfläche, die nur zum Messen von Text dient (Modus "L" wie die Bilder beim Zeichnen)
+MEASURE_DRAW = ImageDraw.Draw(Image.new('L', (1, 1)))
 
 
 def create_output_dir(script_name="text-to-stl"):
@@ -24,6 +85,88 @@ def create_output_dir(script_name="text-to-stl"):
     return output_dir
 
 
+@functools.lru_cache(maxsize=32)
+def load_font(font_path, font_size):
+    """
+    Lädt eine Schriftart, bei Bedarf über die Fallback-Schriftarten des Systems.
+
+    Das Ergebnis wird zwischengespeichert, damit wiederholte Aufrufe mit
+    denselben Einstellungen (Vorschau und STL-Erzeugung in der GUI) die
+    Schriftartdatei nicht erneut suchen und einlesen.
+
+    Args:
+        font_path: Pfad zur Schriftartdatei (ttf) oder None
+        font_size: Die Größe der Schrift in Punkten
+
+    Returns:
+        Tupel (font, source) - die Schriftart und der Pfad der geladenen Datei
+        (None für die Standardschriftart)
+    """
+    try:
+        if font_path and os.path.exists(font_path):
+            return ImageFont.truetype(font_path, font_size), font_path
+
+        for font_option in FALLBACK_FONT_PATHS:
+            try:
+                return ImageFont.truetype(font_option, font_size), font_option
+            except Exception:
+                continue
+    except Exception as e:
+        print(f"Fehler beim Laden der Schriftart: {e}")
+
+    # Wenn keine Schriftart gefunden wird, Standardschriftart verwenden
+    return ImageFont.load_default(), None
+
+
+def text_bbox(text, font_path, font_size):
+    """
+    Bestimmt die Begrenzung des gezeichneten Textes (wie ImageDraw.textbbox am Ursprung).
+
+    Mehrzeiliger Text wird wie beim Zeichnen zeilenweise gemessen.
+
+    Args:
+        text: Der zu messende Text
+        font_path: Pfad zur Schriftartdatei (ttf) oder None
+        font_size: Die Größe der Schrift in Punkten
+
+    Returns:
+        Tupel (left, top, right, bottom)
+    """
+    font, _ = load_font(font_path, font_size)
+    return MEASURE_DRAW.textbbox((0, 0), text, font=font)
+
+
+def blur_text_region(image, blur_radius):
+    """
+    Zeichnet den Text mit einem Gaußfilter weich, ohne den leeren Hintergrund zu filtern.
+
+    Gefiltert wird nur der Bereich um die nicht-weißen Pixel, erweitert um die
+    Reichweite des Filters, und anschließend ins Bild zurückkopiert. Weißer
+    Hintergrund bleibt unter dem Filter weiß, das Ergebnis ist daher identisch
+    mit dem Filtern des ganzen Bildes.
+
+    Args:
+        image: Graustufenbild ('L') mit schwarzem Text auf weißem Grund
+        blur_radius: Radius des Gaußfilters
+
+    Returns:
+        Das weichgezeichnete Bild
+    """
+    bbox = ImageOps.invert(image).getbbox()
+    if bbox is None:
+        return image
+
+    # Reichweite der drei Boxfilter, mit denen Pillow den Gaußfilter annähert
+    margin = BLUR_MARGIN_PASSES * (int(np.ceil(blur_radius)) + 1) + 1
+    left, top, right, bottom = bbox
+    region = (max(left - margin, 0), max(top - margin, 0),
+              min(right + margin, image.width), min(bottom + margin, image.height))
+
+    blurred = image.copy()
+    blurred.paste(image.crop(region).filter(ImageFilter.GaussianBlur(radius=blur_radius)), region[:2])
+    return blurred
+
+
 def text_to_stl(text, font_path=None, font_size=60, thickness=10, filename="text_3d",
                 add_base=True, base_height=2.0, mirror_text=False, blur_radius=0.0,
                 use_timestamp=False):
@@ -69,55 +212,16 @@ def text_to_stl(text, font_path=None, font_size=60, thickness=10, filename="text
     draw = ImageDraw.Draw(image)
 
     # Schriftart laden
-    try:
-        if font_path and os.path.exists(font_path):
-            font = ImageFont.truetype(font_path, font_size)
-            print(f"Schriftart aus {font_path} geladen")
-        else:
-            # Fallback-Schriftarten je nach Betriebssystem
-            import sys
-            if sys.platform == 'darwin':  # macOS
-                font_options = [
-                    '/Library/Fonts/Arial.ttf',
-                    '/System/Library/Fonts/Helvetica.ttc',
-                    '/System/Library/Fonts/Times.ttc'
-                ]
-            elif sys.platform == 'win32':  # Windows
-                font_options = [
-                    'C:\\Windows\\Fonts\\arial.ttf',
-                    'C:\\Windows\\Fonts\\times.ttf',
-                    'C:\\Windows\\Fonts\\calibri.ttf'
-                ]
-            else:  # Linux und andere
-                font_options = [
-                    '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf',
-                    '/usr/share/fonts/TTF/DejaVuSans.ttf',
-                    '/usr/share/fonts/truetype/freefont/FreeSans.ttf'
-                ]
-
-            font_loaded = False
-            for font_option in font_options:
-                try:
-                    if os.path.exists(font_option):
-                        font = ImageFont.truetype(font_option, font_size)
-                        print(f"Fallback-Schriftart {font_option} geladen")
-                        font_loaded = True
-                        break
-                except Exception:
-                    continue
-
-            if not font_loaded:
-                # Wenn keine Schriftart gefunden wird, Standardschriftart verwenden
-                font = ImageFont.load_default()
-                print("Standard-Schriftart geladen")
-    except Exception as e:
-        print(f"Fehler beim Laden der Schriftart: {e}")
-        # Wenn keine Schriftart gefunden wird, Standardschriftart verwenden
-        font = ImageFont.load_default()
+    font, font_source = load_font(font_path, font_size)
+    if font_source is None:
         print("Standard-Schriftart geladen")
+    elif font_source == font_path:
+        print(f"Schriftart aus {font_path} geladen")
+    else:
+        print(f"Fallback-Schriftart {font_source} geladen")
 
     # Text zentrieren
-    bbox = draw.textbbox((0, 0), text, font=font)
+    bbox = text_bbox(text, font_path, font_size)
     text_width = bbox[2] - bbox[0]
     text_height = bbox[3] - bbox[1]
 
@@ -133,7 +237,7 @@ def text_to_stl(text, font_path=None, font_size=60, thickness=10, filename="text
 
     # Weichzeichnung anwenden, wenn gewünscht
     if blur_radius > 0:
-        image = image.filter(ImageFilter.GaussianBlur(radius=blur_radius))
+        image = blur_text_region(image, blur_radius)
         print(f"Weichzeichnung mit Radius {blur_radius} angewendet.")
 
     # Wenn Text nicht gespiegelt werden soll, Bild horizontal spiegeln
@@ -151,151 +255,101 @@ def text_to_stl(text, font_path=None, font_size=60, thickness=10, filename="text
         # Maske erstellen, wo Pixel dunkler als Schwellenwert sind (Text)
         mask = img_array < threshold
 
+        # Wenn keine Textpixel gefunden wurden, Fehler ausgeben
+        rows = np.nonzero(mask.any(axis=1))[0]
+        cols = np.nonzero(mask.any(axis=0))[0]
+        if len(rows) == 0:
+            print("FEHLER: Kein Text gefunden oder Schwellenwert zu niedrig.")
+            return None
+
+        # Nur den Bereich um den Text weiterverarbeiten; die Koordinaten
+        # beziehen sich weiterhin auf das ganze Bild
+        y_min, y_max = rows[0], rows[-1] + 1
+        x_min, x_max = cols[0], cols[-1] + 1
+        img_array = img_array[y_min:y_max, x_min:x_max]
+        mask = mask[y_min:y_max, x_min:x_max]
+
         # Höhenfeld nur für Textpixel erstellen, Rest auf 0 setzen
         height_field = np.zeros_like(img_array)
         height_field[mask] = 255 - img_array[mask]
     else:
+        y_min, y_max, x_min, x_max = 0, height, 0, width
+
         # Höhenfeld für alle Pixel erstellen (Text und Hintergrund)
         height_field = 255 - img_array
 
-    # X und Y Koordinaten erstellen
-    x_grid, y_grid = np.meshgrid(
-        np.arange(width) / 100 * 25.4,  # X-Koordinaten in mm
-        np.arange(height) / 100 * 25.4  # Y-Koordinaten in mm
-    )
+    # X- und Y-Achse in mm (float32, wie in der STL-Datei); ein Pixel (y, x)
+    # liegt bei (x_axis[x], y_axis[y]), ein volles 2D-Gitter wird nicht benötigt
+    x_axis = np.arange(x_min, x_max, dtype=np.float32) * np.float32(PIXEL_SIZE)
+    y_axis = np.arange(y_min, y_max, dtype=np.float32) * np.float32(PIXEL_SIZE)
 
     # Z-Koordinaten aus dem Höhenfeld
-    z_grid = height_field / 255.0 * thickness
+    z_grid = height_field * np.float32(thickness / 255.0)
 
     if not add_base:
         # Vertices nur für Textpixel erstellen
         # Finde alle Nicht-Null-Punkte im Höhenfeld
         mask = z_grid > 0
 
-        # Wenn keine Textpixel gefunden wurden, Fehler ausgeben
-        if not np.any(mask):
-            print("FEHLER: Kein Text gefunden oder Schwellenwert zu niedrig.")
-            return None
-
-        # Vertices für Textpixel erstellen
-        text_vertices = []
-        text_faces = []
-
-        # Finde alle Indizes, wo Maske True ist
-        y_indices, x_indices = np.where(mask)
-
-        # Erzeuge Mesh nur für diese Bereiche
-        vertex_count = 0
-        vertex_map = {}  # Speichert Zuordnung (y, x) -> vertex_index
-
-        for i, (y, x) in enumerate(zip(y_indices, x_indices)):
-            # Prüfe, ob Pixel Teil eines zusammenhängenden Bereichs ist
-            # (hat mindestens einen Nachbarn, der auch Text ist)
-            has_neighbors = False
-            for ny, nx in [(y - 1, x), (y + 1, x), (y, x - 1), (y, x + 1)]:
-                if 0 <= ny < height and 0 <= nx < width and mask[ny, nx]:
-                    has_neighbors = True
-                    break
-
-            if has_neighbors:
-                # Erstelle zwei Dreiecke für jedes Pixel (Ober- und Unterseite)
-                # Obere Ecken
-                top_left = vertex_count
-                text_vertices.append([x_grid[y, x], y_grid[y, x], z_grid[y, x]])
-                vertex_count += 1
-
-                top_right = vertex_count
-                text_vertices.append([x_grid[y, x] + 0.254, y_grid[y, x], z_grid[y, x]])
-                vertex_count += 1
-
-                bottom_left = vertex_count
-                text_vertices.append([x_grid[y, x], y_grid[y, x] + 0.254, z_grid[y, x]])
-                vertex_count += 1
-
-                bottom_right = vertex_count
-                text_vertices.append([x_grid[y, x] + 0.254, y_grid[y, x] + 0.254, z_grid[y, x]])
-                vertex_count += 1
-
-                # Untere Ecken (z=0)
-                base_top_left = vertex_count
-                text_vertices.append([x_grid[y, x], y_grid[y, x], 0])
-                vertex_count += 1
-
-                base_top_right = vertex_count
-                text_vertices.append([x_grid[y, x] + 0.254, y_grid[y, x], 0])
-                vertex_count += 1
-
-                base_bottom_left = vertex_count
-                text_vertices.append([x_grid[y, x], y_grid[y, x] + 0.254, 0])
-                vertex_count += 1
-
-                base_bottom_right = vertex_count
-                text_vertices.append([x_grid[y, x] + 0.254, y_grid[y, x] + 0.254, 0])
-                vertex_count += 1
-
-                # Oberseite (zwei Dreiecke)
-                text_faces.append([top_left, top_right, bottom_left])
-                text_faces.append([bottom_left, top_right, bottom_right])
-
-                # Unterseite (zwei Dreiecke)
-                text_faces.append([base_top_left, base_bottom_left, base_top_right])
-                text_faces.append([base_bottom_left, base_bottom_right, base_top_right])
-
-                # Seitenwände (je zwei Dreiecke pro Seite)
-                # Vorne
-                text_faces.append([top_left, base_top_left, top_right])
-                text_faces.append([top_right, base_top_left, base_top_right])
-
-                # Rechts
-                text_faces.append([top_right, base_top_right, bottom_right])
-                text_faces.append([bottom_right, base_top_right, base_bottom_right])
-
-                # Hinten
-                text_faces.append([bottom_right, base_bottom_right, bottom_left])
-                text_faces.append([bottom_left, base_bottom_right, base_bottom_left])
-
-                # Links
-                text_faces.append([bottom_left, base_bottom_left, top_left])
-                text_faces.append([top_left, base_bottom_left, base_top_left])
-
-        # Vertices und Faces in NumPy-Arrays umwandeln
-        vertices = np.array(text_vertices)
-        faces = np.array(text_faces)
+        # Nur Pixel berücksichtigen, die Teil eines zusammenhängenden Bereichs sind
+        # (mindestens ein direkter Nachbar ist auch Text); der Rand zählt nicht als Text
+        padded = np.pad(mask, 1)
+        has_neighbors = mask & (padded[:-2, 1:-1] | padded[2:, 1:-1] |
+                                padded[1:-1, :-2] | padded[1:-1, 2:])
+
+        # Waagerecht benachbarte Pixel gleicher Höhe zu einem Quader zusammenfassen:
+        # ein Lauf beginnt, wo der linke Nachbar fehlt oder eine andere Höhe hat
+        run_start = has_neighbors.copy()
+        run_start[:, 1:] &= ~(has_neighbors[:, :-1] & (z_grid[:, 1:] == z_grid[:, :-1]))
+
+        # Pixel eines Laufs liegen in Zeilenreihenfolge direkt hintereinander
+        y_indices, x_indices = np.nonzero(has_neighbors)
+        run_first = np.nonzero(run_start[y_indices, x_indices])[0]
+        run_last = np.append(run_first[1:], len(y_indices)) - 1
+
+        y_start, x_start = y_indices[run_first], x_indices[run_first]
+        x_end = x_indices[run_last]
+
+        # Für jeden Lauf einen Quader aus 8 Vertices (4 obere, 4 auf z=0) erzeugen;
+        # rechte Ecken liegen am rechten Rand des letzten Pixels
+        right_corner = VOXEL_CORNERS[:, 0] > 0
+        vertices = np.zeros((len(run_first), 8, 3), dtype=np.float32)
+        vertices[:, :, 0] = np.where(right_corner,
+                                     x_axis[x_end][:, None] + PIXEL_SIZE,
+                                     x_axis[x_start][:, None])
+        vertices[:, :, 1] = y_axis[y_start][:, None] + VOXEL_CORNERS[:, 1]
+        vertices[:, :4, 2] = z_grid[y_start, x_start][:, None]
+        vertices = vertices.reshape(-1, 3)
+
+        # 12 Dreiecke je Quader, Indizes um 8 Vertices pro Quader verschoben
+        faces = (VOXEL_FACES[None, :, :] +
+                 8 * np.arange(len(run_first), dtype=np.int32)[:, None, None]).reshape(-1, 3)
     else:
         # Normale Höhenfeld-zu-Mesh-Methode für alle Pixel
         # Vertices erstellen
         vertices = np.column_stack([
-            x_grid.flatten(),
-            y_grid.flatten(),
-            z_grid.flatten()
+            np.tile(x_axis, len(y_axis)),
+            np.repeat(y_axis, len(x_axis)),
+            z_grid.ravel()
         ])
 
-        # Faces (Dreiecke) erstellen
-        faces = []
-        for y in range(height - 1):
-            for x in range(width - 1):
-                # Index der vier Eckpunkte eines Quadrats
-                i = y * width + x
-                j = y * width + (x + 1)
-                k = (y + 1) * width + x
-                l = (y + 1) * width + (x + 1)
-
-                # Zwei Dreiecke pro Quadrat
-                faces.append([i, j, k])
-                faces.append([j, l, k])
-
-        faces = np.array(faces)
+        # Faces (Dreiecke) erstellen: zwei Dreiecke pro Quadrat,
+        # i ist der Index des linken oberen Eckpunkts
+        i = (np.arange(height - 1, dtype=np.int32)[:, None] * width +
+             np.arange(width - 1, dtype=np.int32)[None, :]).ravel()
+        faces = np.empty((2 * len(i), 3), dtype=np.int32)
+        faces[0::2] = np.column_stack((i, i + 1, i + width))
+        faces[1::2] = np.column_stack((i + 1, i + width + 1, i + width))
 
     # Mesh erstellen
     if len(vertices) > 0 and len(faces) > 0:
-        mesh_obj = trimesh.Trimesh(vertices=vertices, faces=faces)
-
         # Basis (Sockel) hinzufügen wenn gewünscht
         if add_base and base_height > 0:
             print("Erstelle Bodenplatte...")
-            # Einen Quader für die Basis erstellen
-            min_bounds = mesh_obj.bounds[0]
-            max_bounds = mesh_obj.bounds[1]
+            # Einen Quader für die Basis erstellen; die Grenzen kommen direkt
+            # aus dem Vertex-Array, ohne ein Trimesh-Objekt aufzubauen
+            min_bounds = vertices.min(axis=0)
+            max_bounds = vertices.max(axis=0)
             base_dimensions = [
                 max_bounds[0] - min_bounds[0],  # Breite
                 max_bounds[1] - min_bounds[1],  # Länge
@@ -312,15 +366,16 @@ def text_to_stl(text, font_path=None, font_size=60, thickness=10, filename="text
                 min_bounds[2] - base_height
             ])
 
-            # Meshs zusammenführen
-            final_mesh = trimesh.util.concatenate([mesh_obj, base_mesh])
+            # Meshs zusammenführen: Arrays anhängen, Indizes der Box verschieben
+            faces = np.vstack((faces, base_mesh.faces + len(vertices)))
+            vertices = np.vstack((vertices, base_mesh.vertices))
             print("Bodenplatte erstellt.")
         else:
             print("Keine Bodenplatte hinzugefügt.")
-            final_mesh = mesh_obj
 
-        # STL speichern im angegebenen Verzeichnis
-        final_mesh.export(output_path)
+        # STL speichern im angegebenen Verzeichnis; die Dreiecke werden direkt
+        # aus den Arrays geschrieben, ohne ein Trimesh-Objekt aufzubereiten
+        write_binary_stl(output_path, vertices, faces)
 
         print(f"STL-Datei erfolgreich erstellt: {output_path}")
         return output_path
@@ -347,64 +402,20 @@ def generate_preview_image(text, font_path=None, font_size=60, output_path=None)
         width = max(len(text) * font_size, 200)
         height = max(font_size * 2, 100)
 
-        # Weißes Bild erstellen
-        image = Image.new('RGB', (width, height), color=(240, 240, 240))
+        # Gradientenhintergrund erstellen für bessere Visualisierung:
+        # subtiler Gradient von oben nach unten, eine Spalte über alle Zeilen verteilt
+        y_values = np.arange(height)[:, None]
+        r = 240 - y_values * 20 / height
+        b = 255 - y_values * 30 / height
+        gradient = np.stack([r, r, b], axis=2).astype(np.uint8)
+        image = Image.fromarray(np.ascontiguousarray(np.broadcast_to(gradient, (height, width, 3))), 'RGB')
         draw = ImageDraw.Draw(image)
 
         # Schriftart laden
-        try:
-            if font_path and os.path.exists(font_path):
-                font = ImageFont.truetype(font_path, font_size)
-            else:
-                # Fallback-Schriftarten je nach Betriebssystem
-                import sys
-                if sys.platform == 'darwin':  # macOS
-                    font_options = [
-                        '/Library/Fonts/Arial.ttf',
-                        '/System/Library/Fonts/Helvetica.ttc',
-                        '/System/Library/Fonts/Times.ttc'
-                    ]
-                elif sys.platform == 'win32':  # Windows
-                    font_options = [
-                        'C:\\Windows\\Fonts\\arial.ttf',
-                        'C:\\Windows\\Fonts\\times.ttf',
-                        'C:\\Windows\\Fonts\\calibri.ttf'
-                    ]
-                else:  # Linux und andere
-                    font_options = [
-                        '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf',
-                        '/usr/share/fonts/TTF/DejaVuSans.ttf',
-                        '/usr/share/fonts/truetype/freefont/FreeSans.ttf'
-                    ]
-
-                font_loaded = False
-                for font_option in font_options:
-                    try:
-                        if os.path.exists(font_option):
-                            font = ImageFont.truetype(font_option, font_size)
-                            font_loaded = True
-                            break
-                    except Exception:
-                        continue
-
-                if not font_loaded:
-                    # Wenn keine Schriftart gefunden wird, Standardschriftart verwenden
-                    font = ImageFont.load_default()
-        except Exception:
-            # Wenn keine Schriftart gefunden wird, Standardschriftart verwenden
-            font = ImageFont.load_default()
-
-        # Gradientenhintergrund erstellen für bessere Visualisierung
-        for y in range(height):
-            for x in range(width):
-                # Subtiler Gradient von oben nach unten
-                r = int(240 - y * 20 / height)
-                g = int(240 - y * 20 / height)
-                b = int(255 - y * 30 / height)
-                image.putpixel((x, y), (r, g, b))
+        font, _ = load_font(font_path, font_size)
 
         # Text zentrieren
-        bbox = draw.textbbox((0, 0), text, font=font)
+        bbox = text_bbox(text, font_path, font_size)
         text_width = bbox[2] - bbox[0]
         text_height = bbox[3] - bbox[1]
 
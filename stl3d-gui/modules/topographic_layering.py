@@ -4,12 +4,19 @@ Modul zur Erstellung topografischer 3D-Modelle aus Bildern
 
 import os
 import datetime
+import functools
 import numpy as np
 import matplotlib.pyplot as plt
 from PIL import Image
 from stl import mesh
-from tqdm import tqdm
 from utils.file_utils import ensure_directory_exists
+from utils.mesh_utils import fill_mesh_vectors
+
+# Maximale Kantenlänge der Höhenkarte für die 3D-Vorschau
+PREVIEW_MAX_SIZE = 200
+
+# Anzahl der Zeilen und Spalten, die plot_surface zeichnet (Standard von matplotlib)
+PREVIEW_SURFACE_COUNT = 50
 
 def create_output_dir(script_name="topographic-layering"):
     """
@@ -45,15 +52,60 @@ def normalize_heightmap(heightmap):
     """
     Normalisiert die Höhenwerte auf einen Bereich von 0 bis 1.
     
+    Verschiebung und Skalierung laufen in einem Durchgang mit float32-Ergebnis;
+    die STL-Ausgabe speichert ohnehin nur float32.
+    
     Args:
         heightmap: 2D-Array der Höhenwerte
         
     Returns:
-        Normalisiertes Höhenkarten-Array
+        Normalisiertes Höhenkarten-Array (float32)
     """
     min_val = np.min(heightmap)
     max_val = np.max(heightmap)
-    return (heightmap - min_val) / (max_val - min_val)
+    return np.multiply(heightmap - min_val, 1.0 / (max_val - min_val), dtype=np.float32)
+
+def fill_grid_arrays_numpy(heightmap, scale_z, vertices, faces):
+    """
+    Vektorisierte NumPy-Variante von numba_kernels.fill_grid_arrays für Systeme ohne Numba.
+    
+    Args:
+        heightmap: 2D-Array der Höhenwerte
+        scale_z: Skalierungsfaktor für die Höhe (float32)
+        vertices: (H*W, 3)-Zielarray der Vertices
+        faces: (2*(H-1)*(W-1), 3)-Zielarray der Flächen
+    """
+    height, width = heightmap.shape
+
+    # Y-Koordinate wird invertiert, damit das Modell richtig orientiert ist
+    ys, xs = np.mgrid[:height, :width]
+    vertices[:, 0] = xs.ravel()
+    vertices[:, 1] = (height - 1 - ys).ravel()
+    vertices[:, 2] = (heightmap * scale_z).ravel()
+
+    # Zwei Dreiecke pro Quadrat, Index des linken oberen Vertex
+    i = (np.arange(height - 1)[:, None] * width + np.arange(width - 1)[None, :]).ravel()
+    faces[0::2] = np.column_stack((i, i + 1, i + width))
+    faces[1::2] = np.column_stack((i + 1, i + width + 1, i + width))
+
+@functools.lru_cache(maxsize=1)
+def grid_array_filler():
+    """
+    Liefert die schnellste verfügbare Implementierung zum Füllen der Raster-Arrays.
+    
+    Numba wird erst beim ersten Aufruf importiert; die parallele Schleife über
+    die Bildzeilen liegt kompiliert im Numba-Cache. Ohne Numba wird die
+    NumPy-Variante verwendet.
+    
+    Returns:
+        Funktion mit der Signatur von fill_grid_arrays_numpy
+    """
+    try:
+        from modules.numba_kernels import fill_grid_arrays
+    except ImportError:
+        return fill_grid_arrays_numpy
+
+    return fill_grid_arrays
 
 def create_mesh(heightmap, scale_z=10.0, smoothing=1, resolution=1):
     """
@@ -77,82 +129,60 @@ def create_mesh(heightmap, scale_z=10.0, smoothing=1, resolution=1):
 
     # Auflösung reduzieren
     if resolution > 1:
+        # Jeden resolution-ten Pixel übernehmen; unvollständige Randblöcke entfallen
         new_height = height // resolution
         new_width = width // resolution
-        resized_heightmap = np.zeros((new_height, new_width))
-
-        for y in range(new_height):
-            for x in range(new_width):
-                resized_heightmap[y, x] = heightmap[y * resolution, x * resolution]
-
-        heightmap = resized_heightmap
+        heightmap = heightmap[:new_height * resolution:resolution, :new_width * resolution:resolution]
         height, width = heightmap.shape
 
-    # Vertices und Faces erstellen
-    vertices = []
-    faces = []
-
-    # X, Y-Koordinaten erstellen
-    for y in tqdm(range(height), desc="Erstelle Vertices"):
-        for x in range(width):
-            z = heightmap[y, x] * scale_z
-            # Y-Koordinate wird invertiert, damit das Modell richtig orientiert ist
-            vertices.append([x, height - 1 - y, z])
-
-    # Dreiecke erstellen (als Faces)
-    for y in tqdm(range(height - 1), desc="Erstelle Faces"):
-        for x in range(width - 1):
-            # Index der aktuellen Vertex berechnen
-            i = y * width + x
-
-            # Zwei Dreiecke erstellen, die ein Quadrat bilden
-            faces.append([i, i + 1, i + width])
-            faces.append([i + 1, i + width + 1, i + width])
-
-    # Numpy arrays erstellen
-    vertices = np.array(vertices)
-    faces = np.array(faces)
+    # Vertices (ein Vertex pro Pixel) und Faces (zwei Dreiecke pro Quadrat) erstellen
+    vertices = np.empty((height * width, 3), dtype=np.float32)
+    faces = np.empty((2 * (height - 1) * (width - 1), 3), dtype=np.int32)
+    grid_array_filler()(heightmap, np.float32(scale_z), vertices, faces)
 
     # Mesh erstellen
     topo_mesh = mesh.Mesh(np.zeros(len(faces), dtype=mesh.Mesh.dtype))
 
     # Vertices für jedes Dreieck setzen
-    for i, f in enumerate(faces):
-        for j in range(3):
-            topo_mesh.vectors[i][j] = vertices[f[j]]
+    fill_mesh_vectors(topo_mesh.vectors, vertices, faces)
 
     return topo_mesh
 
-def visualize_heightmap(heightmap, output_path):
+def visualize_heightmap(heightmap, output_path, max_size=PREVIEW_MAX_SIZE):
     """
     Visualisiert die Höhenkarte.
     
     Args:
         heightmap: 2D-Array der Höhenwerte
         output_path: Pfad zum Speichern der Visualisierung
+        max_size: Maximale Kantenlänge des für die Vorschau verwendeten Rasters
     """
-    plt.figure(figsize=(10, 8))
-    
-    # 3D-Oberfläche erzeugen
-    from mpl_toolkits.mplot3d import Axes3D
+    # 3D-Oberfläche erzeugen (die Projektion '3d' registriert matplotlib selbst)
     fig = plt.figure(figsize=(12, 10))
     ax = fig.add_subplot(111, projection='3d')
-    
-    # Mesh Grid erstellen
-    y, x = np.mgrid[:heightmap.shape[0], :heightmap.shape[1]]
+
+    # Für die Vorschau genügt ein ausgedünntes Raster; plot_surface zeichnet
+    # ohnehin höchstens PREVIEW_SURFACE_COUNT Zeilen und Spalten
+    stride = max(1, max(heightmap.shape) // max_size)
+    preview = heightmap[::stride, ::stride]
+
+    # Mesh Grid erstellen, Koordinaten in Pixeln des Originalbildes
+    y, x = np.mgrid[:heightmap.shape[0]:stride, :heightmap.shape[1]:stride]
     
     # Oberfläche zeichnen
-    surf = ax.plot_surface(x, y, heightmap, cmap='terrain', linewidth=0, antialiased=True)
+    surf = ax.plot_surface(x, y, preview, cmap='terrain', linewidth=0, antialiased=True,
+                           rcount=PREVIEW_SURFACE_COUNT, ccount=PREVIEW_SURFACE_COUNT)
     
     plt.colorbar(surf, ax=ax, shrink=0.5, aspect=5, label='Höhe')
     plt.title('3D-Höhenkarte')
     
     # Visualisierung speichern
-    plt.savefig(output_path)
-    plt.close()
+    fig.savefig(output_path)
+    plt.close(fig)
 
 def topographic_layering_process(image_path, output_path="output.stl", scale_z=10.0, 
-                              smoothing=1, resolution=1, use_timestamp=False):
+                              smoothing=1, resolution=1, use_timestamp=False,
+                              visualize=True, preview_max_size=PREVIEW_MAX_SIZE):
     """
     Hauptfunktion für das Topographic Layering.
     
@@ -163,6 +193,8 @@ def topographic_layering_process(image_path, output_path="output.stl", scale_z=1
         smoothing: Stärke der Glättung
         resolution: Faktor zur Reduzierung der Auflösung
         use_timestamp: Wenn True, wird der Ausgabedatei ein Zeitstempel hinzugefügt
+        visualize: Wenn True, werden Höhenkarte und 3D-Vorschau als Bilder gespeichert
+        preview_max_size: Maximale Kantenlänge des Rasters für die 3D-Vorschau
         
     Returns:
         Der vollständige Pfad zur erstellten STL-Datei
@@ -187,20 +219,22 @@ def topographic_layering_process(image_path, output_path="output.stl", scale_z=1
     # Höhenkarte normalisieren
     heightmap = normalize_heightmap(heightmap)
 
-    # Debug-Visualisierung der Höhenkarte speichern
-    debug_path = os.path.join(output_dir, os.path.splitext(os.path.basename(output_path))[0] + "_heightmap.png")
-    plt.figure(figsize=(10, 8))
-    plt.imshow(heightmap, cmap='terrain')
-    plt.colorbar(label='Höhe')
-    plt.title('Höhenkarte')
-    plt.savefig(debug_path)
-    plt.close()
-    print(f"Höhenkarte gespeichert unter {debug_path}")
-
-    # 3D-Visualisierung der Höhenkarte speichern
-    vis_path = os.path.join(output_dir, os.path.splitext(os.path.basename(output_path))[0] + "_3d_preview.png")
-    visualize_heightmap(heightmap, vis_path)
-    print(f"3D-Vorschau gespeichert unter {vis_path}")
+    # Visualisierungen nur erzeugen, wenn sie gewünscht sind
+    if visualize:
+        # Debug-Visualisierung der Höhenkarte speichern
+        debug_path = os.path.join(output_dir, os.path.splitext(os.path.basename(output_path))[0] + "_heightmap.png")
+        plt.figure(figsize=(10, 8))
+        plt.imshow(heightmap, cmap='terrain')
+        plt.colorbar(label='Höhe')
+        plt.title('Höhenkarte')
+        plt.savefig(debug_path)
+        plt.close()
+        print(f"Höhenkarte gespeichert unter {debug_path}")
+
+        # 3D-Visualisierung der Höhenkarte speichern
+        vis_path = os.path.join(output_dir, os.path.splitext(os.path.basename(output_path))[0] + "_3d_preview.png")
+        visualize_heightmap(heightmap, vis_path, preview_max_size)
+        print(f"3D-Vorschau gespeichert unter {vis_path}")
 
     # Auf der Konsole ein paar Informationen ausgeben
     print(f"Bildgröße: {heightmap.shape[1]}x{heightmap.shape[0]} Pixel")
@@ -2,14 +2,51 @@
 UI-Komponente für den Contour-Crafting Tab
 """
 
-import os
+import queue
+import threading
+import functools
+import traceback
+from dataclasses import dataclass, replace
+from concurrent.futures import ThreadPoolExecutor
 import tkinter as tk
 from tkinter import ttk, filedialog
 from resources.styles import COLORS
-from utils.gui_utils import create_button, create_labeled_entry, create_log_area
-from modules.contour_crafting import contour_crafting_process
+from utils.gui_utils import (create_button, create_labeled_entry, create_log_area,
+                             start_log_section, drain_message_queue, JobControlMixin,
+                             QUEUE_POLL_INTERVAL)
+from utils.file_utils import (IMAGE_FILETYPES, STL_FILETYPES, join_input_files,
+                              split_input_files, suggest_output_name)
+from utils.result_cache import result_cache_path, load_cached_result, store_result
 
-class ContourCraftingTab:
+
+@functools.lru_cache(maxsize=1)
+def load_contour_crafting():
+    """
+    Importiert das Verarbeitungsmodul erst im Worker-Thread statt beim Laden des Tabs.
+
+    Das Modul zieht numpy, OpenCV usw. nach; der Tab selbst lässt sich so
+    ohne diese Abhängigkeiten aufbauen.
+
+    Returns:
+        Das Modul modules.contour_crafting
+    """
+    from modules import contour_crafting
+    return contour_crafting
+
+@dataclass(frozen=True)
+class ContourParams:
+    """Parameter eines Contour-Crafting-Auftrags, zum Zeitpunkt des Klicks gelesen"""
+    input_file: str
+    output_file: str
+    num_contours: int
+    extrusion_height: float
+    base_height: float
+    smoothing: float
+    invert: bool
+    photo_mode: bool
+    use_timestamp: bool
+
+class ContourCraftingTab(JobControlMixin):
     """Tab für die Erstellung von 3D-Modellen aus Bildern mittels Höhenlinien"""
     
     def __init__(self, parent, status_var, log_redirect):
@@ -26,7 +63,17 @@ class ContourCraftingTab:
         self.log_redirect = log_redirect
         
         self.input_file = ""
+        self.input_files = []
         self.output_file = ""
+
+        # Meldungen des Hintergrund-Threads; Tk-Variablen und Widgets werden
+        # nur im Hauptthread in _process_queue() verändert
+        self.message_queue = queue.Queue()
+
+        # Ein dauerhafter Worker-Thread für alle Konvertierungen dieses Tabs
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="contour-crafting")
+        self.futures = []
+        self.cancel_event = threading.Event()
         
         # Variablen für UI-Elemente
         self.num_contours_var = tk.IntVar(value=10)
@@ -38,6 +85,11 @@ class ContourCraftingTab:
         self.timestamp_var = tk.BooleanVar(value=True)
         
         self.create_widgets()
+        self.parent.after(QUEUE_POLL_INTERVAL, self._process_queue)
+
+        # Verarbeitungsmodul im Worker-Thread vorladen, sobald die GUI untätig ist,
+        # damit der erste Klick nicht auf den Import warten muss
+        self.parent.after_idle(self.executor.submit, load_contour_crafting)
     
     def create_widgets(self):
         """Erstellt die UI-Elemente"""
@@ -117,52 +169,68 @@ class ContourCraftingTab:
         button_frame = ttk.Frame(main_frame)
         button_frame.pack(fill=tk.X, pady=10)
         
-        convert_btn = create_button(button_frame, text="Höhenlinien-Modell erstellen", 
-                                   command=self.create_contour_model)
-        convert_btn.pack(side=tk.LEFT, padx=5)
+        self.convert_btn = create_button(button_frame, text="Höhenlinien-Modell erstellen", 
+                                        command=self.create_contour_model)
+        self.convert_btn.pack(side=tk.LEFT, padx=5)
+
+        self.cancel_btn = create_button(button_frame, text="Abbrechen", command=self.cancel_jobs)
+        self.cancel_btn.pack(side=tk.LEFT, padx=5)
+        self.cancel_btn.configure(state="disabled")
         
         # Log-Bereich
         log_frame, self.log_text = create_log_area(main_frame)
         log_frame.pack(fill=tk.BOTH, expand=True, pady=10)
     
     def browse_input(self):
-        """Öffnet einen Dateiauswahldialog für die Eingabedatei"""
-        filetypes = [
-            ("Bilddateien", "*.jpg *.jpeg *.png *.bmp *.gif *.tiff"),
-            ("JPEG", "*.jpg *.jpeg"),
-            ("PNG", "*.png"),
-            ("Alle Dateien", "*.*")
-        ]
-        filename = filedialog.askopenfilename(filetypes=filetypes)
-        if filename:
-            self.input_file = filename
+        """Öffnet einen Dateiauswahldialog für ein oder mehrere Eingabebilder"""
+        filenames = filedialog.askopenfilenames(filetypes=IMAGE_FILETYPES)
+        if filenames:
+            self.input_files = list(filenames)
+            self.input_file = filenames[0]
             self.input_entry.delete(0, tk.END)
-            self.input_entry.insert(0, filename)
-            
+            self.input_entry.insert(0, join_input_files(filenames))
+
             # Schlage Ausgabedatei vor
             if not self.output_entry.get():
-                base_name = os.path.splitext(os.path.basename(filename))[0]
-                output_file = f"{base_name}_contour.stl"
                 self.output_entry.delete(0, tk.END)
-                self.output_entry.insert(0, output_file)
-    
+                self.output_entry.insert(0, suggest_output_name(filenames[0], "_contour"))
+
     def browse_output(self):
         """Öffnet einen Dateiauswahldialog für die Ausgabedatei"""
-        filetypes = [
-            ("STL-Dateien", "*.stl"),
-            ("Alle Dateien", "*.*")
-        ]
-        filename = filedialog.asksaveasfilename(defaultextension=".stl", filetypes=filetypes)
+        filename = filedialog.asksaveasfilename(defaultextension=".stl", filetypes=STL_FILETYPES)
         if filename:
             self.output_entry.delete(0, tk.END)
             self.output_entry.insert(0, filename)
     
+    def read_params(self, input_file, output_file):
+        """
+        Liest alle Parameter einmalig aus den UI-Elementen.
+
+        Args:
+            input_file: Pfad zum Eingabebild
+            output_file: Name der Ausgabe-STL-Datei
+
+        Returns:
+            ContourParams mit den aktuellen Einstellungen
+        """
+        return ContourParams(
+            input_file=input_file,
+            output_file=output_file,
+            num_contours=self.num_contours_var.get(),
+            extrusion_height=self.extrusion_height_var.get(),
+            base_height=self.base_height_var.get(),
+            smoothing=self.smoothing_var.get(),
+            invert=self.invert_var.get(),
+            photo_mode=self.photo_mode_var.get(),
+            use_timestamp=self.timestamp_var.get()
+        )
+
     def create_contour_model(self):
         """Erstellt ein 3D-Modell aus Höhenlinien des Bildes"""
-        input_file = self.input_entry.get()
+        input_files = split_input_files(self.input_entry.get(), self.input_files)
         output_file = self.output_entry.get()
         
-        if not input_file:
+        if not input_files:
             self.status_var.set("Fehler: Keine Eingabedatei ausgewählt")
             return
         
@@ -171,96 +239,94 @@ class ContourCraftingTab:
             return
         
         try:
-            # Parameter aus den UI-Elementen holen
-            num_contours = self.num_contours_var.get()
-            extrusion_height = self.extrusion_height_var.get()
-            base_height = self.base_height_var.get()
-            smoothing = self.smoothing_var.get()
-            invert = self.invert_var.get()
-            photo_mode = self.photo_mode_var.get()
-            use_timestamp = self.timestamp_var.get()
+            # Parameter einmalig aus den UI-Elementen holen
+            params = self.read_params(input_files[0], output_file)
             
             # Status aktualisieren
-            self.status_var.set("Erstelle 3D-Modell aus Höhenlinien...")
+            if len(input_files) > 1:
+                self.status_var.set(f"Erstelle 3D-Modelle aus Höhenlinien für {len(input_files)} Bilder...")
+            else:
+                self.status_var.set("Erstelle 3D-Modell aus Höhenlinien...")
             
-            # Log-Bereich leeren
-            self.log_text.configure(state="normal")
-            self.log_text.delete(1.0, tk.END)
-            self.log_text.configure(state="disabled")
+            # Neuen Abschnitt im Log beginnen
+            start_log_section(self.log_text)
             
-            # Alle Parameter in ein Dictionary packen
-            params = {
-                'input_file': input_file,
-                'output_file': output_file,
-                'num_contours': num_contours,
-                'extrusion_height': extrusion_height,
-                'base_height': base_height,
-                'smoothing': smoothing,
-                'invert': invert,
-                'photo_mode': photo_mode,
-                'use_timestamp': use_timestamp
-            }
+            # Bei mehreren Bildern erhält jedes Bild einen eigenen Ausgabenamen
+            if len(input_files) > 1:
+                jobs = [replace(params, input_file=input_file,
+                                output_file=suggest_output_name(input_file, "_contour"))
+                        for input_file in input_files]
+            else:
+                jobs = [params]
 
-            # Verarbeitung in einem separaten Thread starten - DIREKT IMPLEMENTIERT
-            import threading
-            thread = threading.Thread(target=self._run_contour_crafting_wrapper, args=(params,))
-            thread.daemon = True
-            thread.start()
+            # Verarbeitung im Worker-Thread starten; der Button bleibt bis zum Ende gesperrt
+            self.cancel_event.clear()
+            self.futures = [self.executor.submit(self._run_contour_crafting, job) for job in jobs]
+            self.convert_btn.configure(state="disabled")
+            self.cancel_btn.configure(state="normal")
 
         except Exception as e:
-            import traceback
             error_msg = f"Fehler bei der Eingabevalidierung: {str(e)}"
             self.status_var.set(error_msg)
             self.log_text.configure(state="normal")
             self.log_text.insert(tk.END, f"{error_msg}\n{traceback.format_exc()}")
             self.log_text.configure(state="disabled")
 
-    def _run_contour_crafting_wrapper(self, params):
-        """
-        Wrapper für _run_contour_crafting, der die Parameter aus einem Dictionary nimmt.
-        """
-        try:
-            # Parameter aus dem Dictionary extrahieren
-            self._run_contour_crafting(
-                params['input_file'],
-                params['output_file'],
-                params['num_contours'],
-                params['extrusion_height'],
-                params['base_height'],
-                params['smoothing'],
-                params['invert'],
-                params['photo_mode'],
-                params['use_timestamp']
-            )
-        except Exception as e:
-            import traceback
-            error_msg = f"Fehler bei der Höhenlinien-Verarbeitung: {str(e)}"
-            print(error_msg)
-            print(traceback.format_exc())
-
-    def _run_contour_crafting(self, input_file, output_file, num_contours, extrusion_height,
-                            base_height, smoothing, invert, photo_mode, use_timestamp):
+    def _run_contour_crafting(self, params):
         """
-        Führt das Contour Crafting in einem separaten Thread aus.
+        Führt das Contour Crafting im Worker-Thread aus.
 
         Args:
-            Alle Parameter werden von create_contour_model() übergeben
+            params: ContourParams aus create_contour_model()
         """
+        # Nach einem Abbruch keine weiteren Aufträge beginnen
+        if self.cancel_event.is_set():
+            return
+
         try:
             # Verarbeitung durchführen
-            print(f"Verarbeite {input_file} mit Contour Crafting...")
-            print(f"Parameter: num_contours={num_contours}, extrusion_height={extrusion_height}")
-            print(f"base_height={base_height}, smoothing={smoothing}")
-            print(f"invert={invert}, photo_mode={photo_mode}")
+            print(f"Verarbeite {params.input_file} mit Contour Crafting...")
+            print(f"Parameter: num_contours={params.num_contours}, extrusion_height={params.extrusion_height}")
+            print(f"base_height={params.base_height}, smoothing={params.smoothing}")
+            print(f"invert={params.invert}, photo_mode={params.photo_mode}")
+
+            contour_crafting = load_contour_crafting()
 
-            result_path = contour_crafting_process(
-                input_file, output_file, num_contours, extrusion_height,
-                base_height, smoothing, invert, photo_mode, use_timestamp
-            )
+            # Bei unveränderter Eingabe und gleichen Parametern das letzte Ergebnis kopieren
+            cache_path = result_cache_path(params.input_file, contour_crafting.contour_crafting_process, {
+                'num_contours': params.num_contours, 'extrusion_height': params.extrusion_height,
+                'base_height': params.base_height, 'smoothing': params.smoothing,
+                'invert': params.invert, 'photo_mode': params.photo_mode
+            })
+            result_path = contour_crafting.build_output_path(params.output_file, params.use_timestamp)
+            if load_cached_result(cache_path, result_path):
+                print("Hinweis: Kantenbild und Vorschaubilder (_original.png, _contours.png) "
+                      "werden dabei nicht neu erzeugt")
+            else:
+                result_path = contour_crafting.contour_crafting_process(
+                    params.input_file, params.output_file, params.num_contours,
+                    params.extrusion_height, params.base_height, params.smoothing,
+                    params.invert, params.photo_mode, params.use_timestamp
+                )
+                store_result(result_path, cache_path)
 
             # Status aktualisieren
-            self.status_var.set(f"Contour Crafting abgeschlossen: {result_path}")
+            self.message_queue.put(('status', f"Contour Crafting abgeschlossen: {result_path}"))
 
         except Exception as e:
-            print(f"Fehler beim Contour Crafting: {str(e)}")
-            self.status_var.set("Fehler beim Contour Crafting")
\ No newline at end of file
+            error_msg = f"Fehler beim Contour Crafting: {str(e)}"
+            self.message_queue.put(('log', f"{error_msg}\n{traceback.format_exc()}"))
+            self.message_queue.put(('status', "Fehler beim Contour Crafting"))
+
+    def _process_queue(self):
+        """
+        Übernimmt die Meldungen des Worker-Threads in Statusleiste und Log.
+
+        Läuft im Tk-Hauptthread und plant sich selbst erneut ein.
+        """
+        drain_message_queue(self.message_queue, self.status_var, self.log_text)
+
+        # Buttons wieder freigeben, sobald alle Aufträge beendet sind
+        self.release_finished_jobs()
+
+        self.parent.after(QUEUE_POLL_INTERVAL, self._process_queue)
@@ -2,14 +2,57 @@
 UI-Komponente für den Image-to-STL Tab
 """
 
-import os
+import queue
+import threading
+import functools
+import traceback
+from dataclasses import dataclass, replace
+from typing import Optional
+from concurrent.futures import ThreadPoolExecutor
 import tkinter as tk
 from tkinter import ttk, filedialog
 from resources.styles import COLORS
-from utils.gui_utils import create_button, create_labeled_entry, create_log_area
-from modules.image_to_stl import image_to_stl
-
-class ImageToSTLTab:
+from utils.gui_utils import (create_button, create_labeled_entry, create_log_area,
+                             start_log_section, drain_message_queue, JobControlMixin,
+                             QUEUE_POLL_INTERVAL)
+from utils.file_utils import (IMAGE_FILETYPES, STL_FILETYPES, join_input_files,
+                              split_input_files, suggest_output_name)
+from utils.result_cache import result_cache_path, load_cached_result, store_result
+
+
+@functools.lru_cache(maxsize=1)
+def load_image_to_stl():
+    """
+    Importiert das Verarbeitungsmodul erst im Worker-Thread statt beim Laden des Tabs.
+
+    Das Modul zieht numpy, OpenCV usw. nach; der Tab selbst lässt sich so
+    ohne diese Abhängigkeiten aufbauen.
+
+    Returns:
+        Das Modul modules.image_to_stl
+    """
+    from modules import image_to_stl
+    return image_to_stl
+
+@dataclass(frozen=True)
+class ConversionParams:
+    """Parameter einer Bildkonvertierung, zum Zeitpunkt des Klicks gelesen"""
+    input_file: str
+    output_file: str
+    max_height: float
+    base_height: float
+    invert: bool
+    smooth: int
+    threshold: Optional[int]
+    border: int
+    max_size: int
+    object_only: bool
+    use_timestamp: bool
+    rotate_x: bool
+    rotate_y: bool
+    rotate_z: bool
+
+class ImageToSTLTab(JobControlMixin):
     """Tab für die Konvertierung von Bildern in STL-Dateien"""
 
     def __init__(self, parent, status_var, log_redirect):
@@ -26,8 +69,18 @@ class ImageToSTLTab:
         self.log_redirect = log_redirect
 
         self.input_file = ""
+        self.input_files = []
         self.output_file = ""
 
+        # Meldungen des Hintergrund-Threads; Tk-Variablen und Widgets werden
+        # nur im Hauptthread in _process_queue() verändert
+        self.message_queue = queue.Queue()
+
+        # Ein dauerhafter Worker-Thread für alle Konvertierungen dieses Tabs
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="image-to-stl")
+        self.futures = []
+        self.cancel_event = threading.Event()
+
         # Variablen für UI-Elemente
         self.max_height_var = tk.DoubleVar(value=5.0)
         self.base_height_var = tk.DoubleVar(value=1.0)
@@ -43,6 +96,11 @@ class ImageToSTLTab:
         self.rotate_z_var = tk.BooleanVar(value=False)
 
         self.create_widgets()
+        self.parent.after(QUEUE_POLL_INTERVAL, self._process_queue)
+
+        # Verarbeitungsmodul im Worker-Thread vorladen, sobald die GUI untätig ist,
+        # damit der erste Klick nicht auf den Import warten muss
+        self.parent.after_idle(self.executor.submit, load_image_to_stl)
 
     def create_widgets(self):
         """Erstellt die UI-Elemente"""
@@ -144,52 +202,91 @@ class ImageToSTLTab:
         button_frame = ttk.Frame(main_frame)
         button_frame.pack(fill=tk.X, pady=10)
 
-        convert_btn = create_button(button_frame, text="Bild in STL konvertieren",
-                                   command=self.convert_image)
-        convert_btn.pack(side=tk.LEFT, padx=5)
+        self.convert_btn = create_button(button_frame, text="Bild in STL konvertieren",
+                                        command=self.convert_image)
+        self.convert_btn.pack(side=tk.LEFT, padx=5)
+
+        self.cancel_btn = create_button(button_frame, text="Abbrechen", command=self.cancel_jobs)
+        self.cancel_btn.pack(side=tk.LEFT, padx=5)
+        self.cancel_btn.configure(state="disabled")
 
         # Log-Bereich
         log_frame, self.log_text = create_log_area(main_frame)
         log_frame.pack(fill=tk.BOTH, expand=True, pady=10)
 
     def browse_input(self):
-        """Öffnet einen Dateiauswahldialog für die Eingabedatei"""
-        filetypes = [
-            ("Bilddateien", "*.jpg *.jpeg *.png *.bmp *.gif *.tiff"),
-            ("JPEG", "*.jpg *.jpeg"),
-            ("PNG", "*.png"),
-            ("Alle Dateien", "*.*")
-        ]
-        filename = filedialog.askopenfilename(filetypes=filetypes)
-        if filename:
-            self.input_file = filename
+        """Öffnet einen Dateiauswahldialog für ein oder mehrere Eingabebilder"""
+        filenames = filedialog.askopenfilenames(filetypes=IMAGE_FILETYPES)
+        if filenames:
+            self.input_files = list(filenames)
+            self.input_file = filenames[0]
             self.input_entry.delete(0, tk.END)
-            self.input_entry.insert(0, filename)
+            self.input_entry.insert(0, join_input_files(filenames))
 
             # Schlage Ausgabedatei vor
             if not self.output_entry.get():
-                base_name = os.path.splitext(os.path.basename(filename))[0]
-                output_file = f"{base_name}.stl"
                 self.output_entry.delete(0, tk.END)
-                self.output_entry.insert(0, output_file)
+                self.output_entry.insert(0, suggest_output_name(filenames[0]))
 
     def browse_output(self):
         """Öffnet einen Dateiauswahldialog für die Ausgabedatei"""
-        filetypes = [
-            ("STL-Dateien", "*.stl"),
-            ("Alle Dateien", "*.*")
-        ]
-        filename = filedialog.asksaveasfilename(defaultextension=".stl", filetypes=filetypes)
+        filename = filedialog.asksaveasfilename(defaultextension=".stl", filetypes=STL_FILETYPES)
         if filename:
             self.output_entry.delete(0, tk.END)
             self.output_entry.insert(0, filename)
 
+    def read_params(self, input_file, output_file):
+        """
+        Liest alle Parameter einmalig aus den UI-Elementen.
+
+        Args:
+            input_file: Pfad zum Eingabebild
+            output_file: Name der Ausgabe-STL-Datei
+
+        Returns:
+            ConversionParams mit den aktuellen Einstellungen oder None, wenn
+            Randbreite oder Max. Größe ungültig sind (Meldung in der Statusleiste)
+        """
+        # Threshold kann leer sein (= None)
+        threshold_str = self.threshold_var.get()
+        threshold = None if not threshold_str.strip() else int(threshold_str)
+
+        # Numerische Parameter: Validieren und Fehlermeldungen anzeigen
+        try:
+            border = self.border_var.get()
+        except Exception:
+            self.status_var.set("Fehler: Ungültiger Wert für Randbreite. Bitte geben Sie eine Zahl ein.")
+            return None
+
+        try:
+            max_size = self.max_size_var.get()
+        except Exception:
+            self.status_var.set("Fehler: Ungültiger Wert für Max. Größe. Bitte geben Sie eine Zahl ein.")
+            return None
+
+        return ConversionParams(
+            input_file=input_file,
+            output_file=output_file,
+            max_height=self.max_height_var.get(),
+            base_height=self.base_height_var.get(),
+            invert=self.invert_var.get(),
+            smooth=self.smooth_var.get(),
+            threshold=threshold,
+            border=border,
+            max_size=max_size,
+            object_only=self.object_only_var.get(),
+            use_timestamp=self.timestamp_var.get(),
+            rotate_x=self.rotate_x_var.get(),
+            rotate_y=self.rotate_y_var.get(),
+            rotate_z=self.rotate_z_var.get()
+        )
+
     def convert_image(self):
         """Konvertiert das Bild in eine STL-Datei"""
-        input_file = self.input_entry.get()
+        input_files = split_input_files(self.input_entry.get(), self.input_files)
         output_file = self.output_entry.get()
 
-        if not input_file:
+        if not input_files:
             self.status_var.set("Fehler: Keine Eingabedatei ausgewählt")
             return
 
@@ -198,133 +295,99 @@ class ImageToSTLTab:
             return
 
         try:
-            # Parameter aus den UI-Elementen holen
-            max_height = self.max_height_var.get()
-            base_height = self.base_height_var.get()
-            invert = self.invert_var.get()
-            smooth = self.smooth_var.get()
-
-            # Threshold kann leer sein (= None)
-            threshold_str = self.threshold_var.get()
-            threshold = None if not threshold_str.strip() else int(threshold_str)
-
-            # Numerische Parameter: Validieren und Fehlermeldungen anzeigen
-            try:
-                border = self.border_var.get()
-            except Exception:
-                self.status_var.set("Fehler: Ungültiger Wert für Randbreite. Bitte geben Sie eine Zahl ein.")
-                return
-
-            try:
-                max_size = self.max_size_var.get()
-            except Exception:
-                self.status_var.set("Fehler: Ungültiger Wert für Max. Größe. Bitte geben Sie eine Zahl ein.")
+            # Parameter einmalig aus den UI-Elementen holen
+            params = self.read_params(input_files[0], output_file)
+            if params is None:
                 return
 
-            object_only = self.object_only_var.get()
-            use_timestamp = self.timestamp_var.get()
-
-            # Rotationen
-            rotate_x = self.rotate_x_var.get()
-            rotate_y = self.rotate_y_var.get()
-            rotate_z = self.rotate_z_var.get()
-
             # Status aktualisieren
-            self.status_var.set("Konvertiere Bild zu STL...")
-
-            # Log-Bereich leeren
-            self.log_text.configure(state="normal")
-            self.log_text.delete(1.0, tk.END)
-            self.log_text.configure(state="disabled")
-
-            # Alle Parameter in ein Dictionary packen, um sie einfacher zu übergeben
-            params = {
-                'input_file': input_file,
-                'output_file': output_file,
-                'max_height': max_height,
-                'base_height': base_height,
-                'invert': invert,
-                'smooth': smooth,
-                'threshold': threshold,
-                'border': border,
-                'max_size': max_size,
-                'object_only': object_only,
-                'use_timestamp': use_timestamp,
-                'rotate_x': rotate_x,
-                'rotate_y': rotate_y,
-                'rotate_z': rotate_z
-            }
-
-            # Konvertierung in einem separaten Thread starten - DIREKT IMPLEMENTIERT
-            import threading
-            thread = threading.Thread(target=self._run_conversion_wrapper, args=(params,))
-            thread.daemon = True  # Daemon-Eigenschaft MUSS vor dem Start gesetzt werden
-            thread.start()
+            if len(input_files) > 1:
+                self.status_var.set(f"Konvertiere {len(input_files)} Bilder zu STL...")
+            else:
+                self.status_var.set("Konvertiere Bild zu STL...")
+
+            # Neuen Abschnitt im Log beginnen
+            start_log_section(self.log_text)
+
+            # Bei mehreren Bildern erhält jedes Bild einen eigenen Ausgabenamen
+            if len(input_files) > 1:
+                jobs = [replace(params, input_file=input_file,
+                                output_file=suggest_output_name(input_file))
+                        for input_file in input_files]
+            else:
+                jobs = [params]
+
+            # Konvertierung im Worker-Thread starten; der Button bleibt bis zum Ende gesperrt
+            self.cancel_event.clear()
+            self.futures = [self.executor.submit(self._run_conversion, job) for job in jobs]
+            self.convert_btn.configure(state="disabled")
+            self.cancel_btn.configure(state="normal")
 
         except Exception as e:
-            import traceback
             error_msg = f"Fehler bei der Eingabevalidierung: {str(e)}"
             self.status_var.set(error_msg)
             self.log_text.configure(state="normal")
             self.log_text.insert(tk.END, f"{error_msg}\n{traceback.format_exc()}")
             self.log_text.configure(state="disabled")
 
-    def _run_conversion_wrapper(self, params):
-        """
-        Wrapper für _run_conversion, der die Parameter aus einem Dictionary nimmt.
-        Dies vereinfacht den Thread-Start und verhindert Probleme mit der Reihenfolge.
-        """
-        try:
-            # Parameter aus dem Dictionary extrahieren
-            self._run_conversion(
-                params['input_file'],
-                params['output_file'],
-                params['max_height'],
-                params['base_height'],
-                params['invert'],
-                params['smooth'],
-                params['threshold'],
-                params['border'],
-                params['max_size'],
-                params['object_only'],
-                params['use_timestamp'],
-                params['rotate_x'],
-                params['rotate_y'],
-                params['rotate_z']
-            )
-        except Exception as e:
-            import traceback
-            error_msg = f"Fehler bei der Konvertierung: {str(e)}"
-            print(error_msg)
-            print(traceback.format_exc())
-
-    def _run_conversion(self, input_file, output_file, max_height, base_height, invert,
-                       smooth, threshold, border, max_size, object_only, use_timestamp,
-                       rotate_x, rotate_y, rotate_z):
+    def _run_conversion(self, params):
         """
-        Führt die Konvertierung in einem separaten Thread aus.
+        Führt die Konvertierung im Worker-Thread aus.
 
         Args:
-            Alle Parameter werden von convert_image() übergeben
+            params: ConversionParams aus convert_image()
         """
+        # Nach einem Abbruch keine weiteren Aufträge beginnen
+        if self.cancel_event.is_set():
+            return
+
         try:
             # Konvertierung durchführen
-            print(f"Konvertiere {input_file} zu STL...")
-            print(f"Parameter: max_height={max_height}, base_height={base_height}, invert={invert}")
-            print(f"smooth={smooth}, threshold={threshold}, border={border}")
-            print(f"max_size={max_size}, object_only={object_only}")
-            print(f"Rotation: X={rotate_x}, Y={rotate_y}, Z={rotate_z}")
-
-            result_path = image_to_stl(
-                input_file, output_file, width=None, height=None,
-                max_height=max_height, base_height=base_height, invert=invert,
-                smooth=smooth, threshold=threshold, border=border, max_size=max_size,
-                object_only=object_only, rotate_x=rotate_x, rotate_y=rotate_y, rotate_z=rotate_z
-            )
+            print(f"Konvertiere {params.input_file} zu STL...")
+            print(f"Parameter: max_height={params.max_height}, base_height={params.base_height}, invert={params.invert}")
+            print(f"smooth={params.smooth}, threshold={params.threshold}, border={params.border}")
+            print(f"max_size={params.max_size}, object_only={params.object_only}")
+            print(f"Rotation: X={params.rotate_x}, Y={params.rotate_y}, Z={params.rotate_z}")
+
+            image_to_stl = load_image_to_stl()
+
+            # Bei unveränderter Eingabe und gleichen Parametern das letzte Ergebnis kopieren
+            cache_path = result_cache_path(params.input_file, image_to_stl.image_to_stl, {
+                'max_height': params.max_height, 'base_height': params.base_height,
+                'invert': params.invert, 'smooth': params.smooth,
+                'threshold': params.threshold, 'border': params.border,
+                'max_size': params.max_size, 'object_only': params.object_only,
+                'rotate_x': params.rotate_x, 'rotate_y': params.rotate_y, 'rotate_z': params.rotate_z
+            })
+            result_path = image_to_stl.build_output_path(params.output_file)
+            if not load_cached_result(cache_path, result_path):
+                result_path = image_to_stl.image_to_stl(
+                    params.input_file, params.output_file, width=None, height=None,
+                    max_height=params.max_height, base_height=params.base_height,
+                    invert=params.invert, smooth=params.smooth, threshold=params.threshold,
+                    border=params.border, max_size=params.max_size,
+                    object_only=params.object_only, rotate_x=params.rotate_x,
+                    rotate_y=params.rotate_y, rotate_z=params.rotate_z
+                )
+                store_result(result_path, cache_path)
             
             # Status aktualisieren
-            self.status_var.set(f"Konvertierung abgeschlossen: {result_path}")
+            self.message_queue.put(('status', f"Konvertierung abgeschlossen: {result_path}"))
             
         except Exception as e:
-            print(f"Fehler bei der Konvertierung: {str(e)}")
-            self.status_var.set("Fehler bei der Konvertierung")
\ No newline at end of file
+            error_msg = f"Fehler bei der Konvertierung: {str(e)}"
+            self.message_queue.put(('log', f"{error_msg}\n{traceback.format_exc()}"))
+            self.message_queue.put(('status', "Fehler bei der Konvertierung"))
+
+    def _process_queue(self):
+        """
+        Übernimmt die Meldungen des Worker-Threads in Statusleiste und Log.
+
+        Läuft im Tk-Hauptthread und plant sich selbst erneut ein.
+        """
+        drain_message_queue(self.message_queue, self.status_var, self.log_text)
+
+        # Buttons wieder freigeben, sobald alle Aufträge beendet sind
+        self.release_finished_jobs()
+
+        self.parent.after(QUEUE_POLL_INTERVAL, self._process_queue)
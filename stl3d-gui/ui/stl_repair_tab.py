@@ -3,11 +3,19 @@ UI-Komponente für den STL-Repair Tab
 """
 
 import os
+import queue
+import shutil
+import traceback
+from concurrent.futures import ThreadPoolExecutor
 import tkinter as tk
 from tkinter import ttk, filedialog
 from resources.styles import COLORS
-from utils.gui_utils import create_button, create_labeled_entry, create_log_area
-from modules.stl_repair import fix_stl, validate_stl
+from utils.file_utils import STL_FILETYPES, suggest_output_name
+from utils.stl_probe import probe_stl
+from utils.gui_utils import (create_button, create_labeled_entry, create_log_area,
+                             start_log_section, drain_message_queue, QUEUE_POLL_INTERVAL)
+from modules.stl_repair import (fix_stl, fix_stl_batch, build_output_path, cached_validate_stl,
+                                lookup_validation, store_validation, clear_validation_cache)
 
 class STLRepairTab:
     """Tab für die Reparatur von STL-Dateien"""
@@ -27,6 +35,16 @@ class STLRepairTab:
         
         self.input_file = ""
         self.output_file = ""
+        self.batch_paths = []
+        
+        # Meldungen der Worker-Threads; Tk-Variablen und Widgets werden
+        # nur im Hauptthread in _process_queue() verändert
+        self.message_queue = queue.Queue()
+        
+        # Dauerhafte Worker-Threads für Validierung und Reparatur, statt pro Klick
+        # einen neuen Thread zu starten
+        self.executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="stl-repair")
+        self.parent.bind("<Destroy>", self.shutdown_executor, add="+")
         
         # Variablen für UI-Elemente
         self.verbose_var = tk.BooleanVar(value=True)
@@ -36,7 +54,36 @@ class STLRepairTab:
         self.timeout_var = tk.IntVar(value=30)
         self.timestamp_var = tk.BooleanVar(value=True)
         
+        # Aktuelle Werte als Python-Attribute spiegeln, damit repair_stl()
+        # nicht für jeden Parameter den Tcl-Interpreter abfragen muss
+        self.cache_var_value("verbose", self.verbose_var)
+        self.cache_var_value("aggressive", self.aggressive_var)
+        self.cache_var_value("clean_model_flag", self.clean_var)
+        self.cache_var_value("max_iterations", self.iterations_var)
+        self.cache_var_value("timeout", self.timeout_var)
+        self.cache_var_value("use_timestamp", self.timestamp_var)
+        
         self.create_widgets()
+        self.parent.after(QUEUE_POLL_INTERVAL, self._process_queue)
+    
+    def cache_var_value(self, attribute, variable):
+        """
+        Hält ein Attribut des Tabs auf dem Wert einer Tk-Variable.
+        
+        Args:
+            attribute: Name des Attributs
+            variable: Tk-Variable, deren Änderungen übernommen werden; bei
+                      einer ungültigen Eingabe (z. B. Text in einem IntVar-Feld)
+                      wird das Attribut auf None gesetzt
+        """
+        def update(*args):
+            try:
+                setattr(self, attribute, variable.get())
+            except tk.TclError:
+                setattr(self, attribute, None)
+        
+        update()
+        variable.trace_add("write", update)
     
     def create_widgets(self):
         """Erstellt die UI-Elemente"""
@@ -119,36 +166,35 @@ class STLRepairTab:
                                   command=self.repair_stl)
         repair_btn.pack(side=tk.LEFT, padx=5)
         
+        batch_btn = create_button(button_frame, text="Mehrere STL reparieren", 
+                                 command=self.browse_batch)
+        batch_btn.pack(side=tk.LEFT, padx=5)
+        
         # Log-Bereich
         log_frame, self.log_text = create_log_area(main_frame)
         log_frame.pack(fill=tk.BOTH, expand=True, pady=10)
     
     def browse_input(self):
         """Öffnet einen Dateiauswahldialog für die Eingabedatei"""
-        filetypes = [
-            ("STL-Dateien", "*.stl"),
-            ("Alle Dateien", "*.*")
-        ]
-        filename = filedialog.askopenfilename(filetypes=filetypes)
+        filename = filedialog.askopenfilename(filetypes=STL_FILETYPES)
         if filename:
+            self.clear_cache()
             self.input_file = filename
             self.input_entry.delete(0, tk.END)
             self.input_entry.insert(0, filename)
             
             # Schlage Ausgabedatei vor
             if not self.output_entry.get():
-                base_name = os.path.splitext(os.path.basename(filename))[0]
-                output_file = f"{base_name}_repaired.stl"
                 self.output_entry.delete(0, tk.END)
-                self.output_entry.insert(0, output_file)
+                self.output_entry.insert(0, suggest_output_name(filename, "_repaired"))
+    
+    def clear_cache(self):
+        """Verwirft die zwischengespeicherten Validierungsergebnisse"""
+        clear_validation_cache()
     
     def browse_output(self):
         """Öffnet einen Dateiauswahldialog für die Ausgabedatei"""
-        filetypes = [
-            ("STL-Dateien", "*.stl"),
-            ("Alle Dateien", "*.*")
-        ]
-        filename = filedialog.asksaveasfilename(defaultextension=".stl", filetypes=filetypes)
+        filename = filedialog.asksaveasfilename(defaultextension=".stl", filetypes=STL_FILETYPES)
         if filename:
             self.output_entry.delete(0, tk.END)
             self.output_entry.insert(0, filename)
@@ -161,23 +207,50 @@ class STLRepairTab:
             self.status_var.set("Fehler: Keine Eingabedatei ausgewählt")
             return
         
+        if not self.check_input_file(input_file):
+            return
+        
         # Status aktualisieren
         self.status_var.set("Validiere STL-Datei...")
         
-        # Log-Bereich leeren
-        self.log_text.configure(state="normal")
-        self.log_text.delete(1.0, tk.END)
-        self.log_text.configure(state="disabled")
+        # Neuen Abschnitt im Log beginnen
+        start_log_section(self.log_text)
         
         # Validierung in einem separaten Thread starten
         self.start_validation_thread(input_file)
     
+    def check_input_file(self, input_file):
+        """
+        Prüft im Hauptthread anhand des Dateianfangs, ob die Eingabe eine STL-Datei ist.
+        
+        So wird für eine versehentlich gewählte (womöglich große) Datei gar
+        nicht erst ein Auftrag gestartet.
+        
+        Args:
+            input_file: Pfad zur Eingabedatei
+            
+        Returns:
+            True, wenn die Datei verarbeitet werden kann, sonst False
+            (Meldung in der Statusleiste)
+        """
+        if not os.path.isfile(input_file):
+            self.status_var.set(f"Fehler: Eingabedatei nicht gefunden: {input_file}")
+            return False
+        
+        if probe_stl(input_file) is None:
+            self.status_var.set(f"Fehler: Keine gültige STL-Datei: {os.path.basename(input_file)}")
+            return False
+        
+        return True
+    
+    def shutdown_executor(self, event=None):
+        """Gibt die Worker-Threads frei, sobald der Tab zerstört wird"""
+        if event is None or event.widget is self.parent:
+            self.executor.shutdown(wait=False)
+    
     def start_validation_thread(self, input_file):
-        """Startet einen Thread zur Validierung mit dem übergebenen Dateipfad"""
-        import threading
-        thread = threading.Thread(target=self._run_validation, args=(input_file,))
-        thread.daemon = True
-        thread.start()
+        """Übergibt die Validierung mit dem übergebenen Dateipfad an den Worker-Thread"""
+        self.executor.submit(self._run_validation, input_file)
     
     def _run_validation(self, input_file):
         """
@@ -190,24 +263,24 @@ class STLRepairTab:
             # Validierung durchführen
             print(f"Validiere STL-Datei: {input_file}")
             
-            is_valid, stats = validate_stl(input_file, verbose=True)
+            is_valid, stats = cached_validate_stl(input_file, verbose=True)
             
-            print("\nSTL-Validierungsergebnisse:")
-            print(f"Datei: {input_file}")
-            for key, value in stats.items():
-                print(f"{key}: {value}")
+            # Ergebnisblock mit einem einzigen print() ausgeben
+            lines = ["\nSTL-Validierungsergebnisse:", f"Datei: {input_file}"]
+            lines.extend(f"{key}: {value}" for key, value in stats.items())
+            print("\n".join(lines))
             
             if is_valid:
                 print("\nDie STL-Datei ist für den 3D-Druck geeignet.")
-                self.status_var.set("Validierung abgeschlossen: Datei ist gültig")
+                self.message_queue.put(('status', "Validierung abgeschlossen: Datei ist gültig"))
             else:
                 print("\nDie STL-Datei hat Probleme, die den 3D-Druck beeinträchtigen könnten.")
                 print("Klicke auf 'STL reparieren', um die Datei zu reparieren.")
-                self.status_var.set("Validierung abgeschlossen: Probleme gefunden")
+                self.message_queue.put(('status', "Validierung abgeschlossen: Probleme gefunden"))
                 
         except Exception as e:
-            print(f"Fehler bei der Validierung: {str(e)}")
-            self.status_var.set("Fehler bei der Validierung")
+            self.message_queue.put(('log', f"Fehler bei der Validierung: {str(e)}\n"))
+            self.message_queue.put(('status', "Fehler bei der Validierung"))
     
     def repair_stl(self):
         """Repariert die STL-Datei"""
@@ -218,49 +291,127 @@ class STLRepairTab:
             self.status_var.set("Fehler: Keine Eingabedatei ausgewählt")
             return
         
+        if not self.check_input_file(input_file):
+            return
+        
         if not output_file:
-            base_name = os.path.splitext(os.path.basename(input_file))[0]
-            output_file = f"{base_name}_repaired.stl"
+            output_file = suggest_output_name(input_file, "_repaired")
             self.output_entry.delete(0, tk.END)
             self.output_entry.insert(0, output_file)
         
+        if not self.check_repair_options():
+            return
+        
         try:
-            # Parameter aus den UI-Elementen holen
-            verbose = self.verbose_var.get()
-            aggressive = self.aggressive_var.get()
-            clean_model_flag = self.clean_var.get()
-            max_iterations = self.iterations_var.get()
-            timeout = self.timeout_var.get()
-            use_timestamp = self.timestamp_var.get()
-            
             # Status aktualisieren
             self.status_var.set("Repariere STL-Datei...")
             
-            # Log-Bereich leeren
-            self.log_text.configure(state="normal")
-            self.log_text.delete(1.0, tk.END)
-            self.log_text.configure(state="disabled")
+            # Neuen Abschnitt im Log beginnen
+            start_log_section(self.log_text)
             
             # Reparatur in einem separaten Thread starten
             self.start_repair_thread(
-                input_file, output_file, verbose, aggressive, clean_model_flag,
-                max_iterations, timeout, use_timestamp
+                input_file, output_file, self.verbose, self.aggressive, self.clean_model_flag,
+                self.max_iterations, self.timeout, self.use_timestamp
             )
         
         except Exception as e:
-            import traceback
             error_msg = f"Fehler bei der Eingabevalidierung: {str(e)}"
             self.status_var.set(error_msg)
-            self.log_text.configure(state="normal")
-            self.log_text.insert(tk.END, f"{error_msg}\n{traceback.format_exc()}")
-            self.log_text.configure(state="disabled")
+            self.message_queue.put(('error', (error_msg, self.capture_traceback(e))))
+    
+    def check_repair_options(self):
+        """
+        Prüft die numerischen Reparatur-Optionen.
+        
+        Returns:
+            True, wenn alle Werte gültig sind, sonst False (Meldung in der Statusleiste)
+        """
+        if self.max_iterations is None:
+            self.status_var.set("Fehler: Ungültiger Wert für Max. Iterationen. Bitte geben Sie eine Zahl ein.")
+            return False
+        
+        if self.timeout is None:
+            self.status_var.set("Fehler: Ungültiger Wert für Timeout. Bitte geben Sie eine Zahl ein.")
+            return False
+        
+        return True
+    
+    def browse_batch(self):
+        """Wählt mehrere STL-Dateien aus und repariert sie nacheinander"""
+        filenames = filedialog.askopenfilenames(filetypes=STL_FILETYPES)
+        if filenames:
+            self.batch_paths = list(filenames)
+            self.repair_batch()
+    
+    def repair_batch(self):
+        """Repariert alle Dateien aus self.batch_paths in einem gemeinsamen Auftrag"""
+        if not self.check_repair_options():
+            return
+        
+        # Offensichtlich ungeeignete Dateien schon vor dem Start aussortieren
+        paths = [path for path in self.batch_paths if probe_stl(path) is not None]
+        skipped = len(self.batch_paths) - len(paths)
+        if not paths:
+            self.status_var.set("Fehler: Keine gültigen STL-Dateien ausgewählt")
+            return
+        
+        if skipped:
+            self.status_var.set(f"Repariere {len(paths)} STL-Dateien ({skipped} ungültige übersprungen)...")
+        else:
+            self.status_var.set(f"Repariere {len(paths)} STL-Dateien...")
+        
+        # Neuen Abschnitt im Log beginnen
+        start_log_section(self.log_text)
+        
+        self.executor.submit(
+            self._run_batch, paths, self.verbose, self.aggressive, self.clean_model_flag,
+            self.max_iterations, self.timeout, self.use_timestamp
+        )
+    
+    def _run_batch(self, paths, verbose, aggressive, clean_model_flag,
+                   max_iterations, timeout, use_timestamp):
+        """
+        Repariert mehrere Dateien parallel in Worker-Prozessen.
+        
+        Die Ausgaben einer Datei werden im Worker-Prozess gesammelt und nach
+        ihrem Abschluss als ein Block über die Nachrichten-Warteschlange ins Log
+        übernommen. Die Ausgabedateien erhalten eindeutige Standardnamen.
+        
+        Args:
+            paths: Liste der Eingabedateien
+            Alle weiteren Parameter werden von repair_batch() übergeben
+        """
+        finished = 0
+        
+        def report(index, input_file, result_path, stats, log):
+            nonlocal finished
+            finished += 1
+            lines = [f"[{index + 1}/{len(paths)}] {input_file}\n", log]
+            if result_path is not None:
+                state = "wasserdicht" if stats.get('is_watertight', False) else "nicht wasserdicht"
+                lines.append(f"  -> {result_path} ({state})\n")
+            self.message_queue.put(('log', "".join(lines)))
+            self.message_queue.put(('status', f"Stapelreparatur: {finished} von {len(paths)} Dateien bearbeitet"))
+        
+        try:
+            results = fix_stl_batch(
+                paths, on_result=report, verbose=verbose, aggressive=aggressive,
+                clean_model_flag=clean_model_flag, max_iterations=max_iterations,
+                timeout=timeout, use_timestamp=use_timestamp
+            )
+        except Exception as e:
+            error_msg = f"Fehler bei der Stapelreparatur: {str(e)}"
+            self.message_queue.put(('error', (error_msg, self.capture_traceback(e))))
+            self.message_queue.put(('status', "Fehler bei der Stapelreparatur"))
+            return
+        
+        repaired = sum(result is not None for result in results)
+        self.message_queue.put(('status', f"Stapelreparatur abgeschlossen: {repaired} von {len(paths)} Dateien repariert"))
     
     def start_repair_thread(self, *args):
-        """Startet einen Thread zur Reparatur mit den übergebenen Parametern"""
-        import threading
-        thread = threading.Thread(target=self._run_repair, args=args)
-        thread.daemon = True
-        thread.start()
+        """Übergibt die Reparatur mit den übergebenen Parametern an den Worker-Thread"""
+        self.executor.submit(self._run_repair, *args)
     
     def _run_repair(self, input_file, output_file, verbose, aggressive, clean_model_flag,
                    max_iterations, timeout, use_timestamp):
@@ -272,23 +423,40 @@ class STLRepairTab:
         """
         try:
             # Reparatur durchführen
-            print(f"Repariere STL-Datei: {input_file}")
-            print(f"Optionen: Aggressive Reparatur: {'Aktiviert' if aggressive else 'Deaktiviert'}")
-            print(f"         Rahmenentfernung: {'Aktiviert' if clean_model_flag else 'Deaktiviert'}")
-            print(f"         Max. Iterationen: {max_iterations}")
-            print(f"         Timeout: {timeout} Sekunden")
+            print("\n".join([
+                f"Repariere STL-Datei: {input_file}",
+                f"Optionen: Aggressive Reparatur: {'Aktiviert' if aggressive else 'Deaktiviert'}",
+                f"         Rahmenentfernung: {'Aktiviert' if clean_model_flag else 'Deaktiviert'}",
+                f"         Max. Iterationen: {max_iterations}",
+                f"         Timeout: {timeout} Sekunden"
+            ]))
             
-            result_path = fix_stl(
+            # Wurde die Datei bereits als fehlerfrei validiert, gibt es ohne Rahmenentfernung
+            # nichts zu reparieren; sie wird dann nur ins Ausgabeverzeichnis kopiert. Das gilt
+            # nur für binäre Dateien, da fix_stl() immer binär exportiert und eine ASCII-Datei
+            # sonst je nach vorheriger Validierung in unterschiedlichem Format ausgegeben würde
+            cached = lookup_validation(input_file)
+            if cached is not None and cached[0] and not clean_model_flag and probe_stl(input_file):
+                result_path = build_output_path(input_file, output_file, use_timestamp)
+                if os.path.abspath(result_path) != os.path.abspath(input_file):
+                    shutil.copyfile(input_file, result_path)
+                store_validation(result_path, *cached)
+                print("\nDie Datei ist bereits wasserdicht und konsistent orientiert. "
+                      "Reparatur übersprungen, Datei unverändert kopiert (nicht neu exportiert).")
+                self.message_queue.put(('status', f"Keine Reparatur nötig, Datei unverändert kopiert: {result_path}"))
+                return
+            
+            # Die Statistiken des reparierten Meshes ersparen das erneute Laden zur Validierung
+            result_path, stats = fix_stl(
                 input_file, output_file, verbose, aggressive, clean_model_flag,
-                max_iterations, timeout, use_timestamp
+                max_iterations, timeout, use_timestamp, return_stats=True
             )
             
             # Status aktualisieren
-            self.status_var.set(f"Reparatur erfolgreich abgeschlossen: {result_path}")
+            self.message_queue.put(('status', f"Reparatur erfolgreich abgeschlossen: {result_path}"))
             
             # Validiere das Ergebnis
             print("\nValidierung der reparierten Datei:")
-            is_valid, stats = validate_stl(result_path, verbose=False)
             
             if stats.get('is_watertight', False):
                 print("SUCCESS: Mesh ist wasserdicht")
@@ -298,7 +466,29 @@ class STLRepairTab:
                     print("TIPP: Aktiviere 'Aggressive Reparatur' für wasserdichte Meshes")
                 
         except Exception as e:
-            print(f"Fehler bei der Reparatur: {str(e)}")
-            import traceback
-            traceback.print_exc()
-            self.status_var.set("Fehler bei der Reparatur")
\ No newline at end of file
+            error_msg = f"Fehler bei der Reparatur: {str(e)}"
+            self.message_queue.put(('error', (error_msg, self.capture_traceback(e))))
+            self.message_queue.put(('status', "Fehler bei der Reparatur"))
+    
+    def capture_traceback(self, exception):
+        """
+        Hält den Traceback einer Ausnahme fest, ohne ihn schon zu formatieren.
+        
+        Quelltextzeilen werden erst beim Formatieren in drain_message_queue() gelesen.
+        
+        Args:
+            exception: Die aufgetretene Ausnahme
+            
+        Returns:
+            traceback.TracebackException für die Ausnahme
+        """
+        return traceback.TracebackException.from_exception(exception, lookup_lines=False)
+    
+    def _process_queue(self):
+        """
+        Übernimmt die Meldungen der Worker-Threads in Statusleiste und Log.
+        
+        Läuft im Tk-Hauptthread und plant sich selbst erneut ein.
+        """
+        drain_message_queue(self.message_queue, self.status_var, self.log_text)
+        self.parent.after(QUEUE_POLL_INTERVAL, self._process_queue)
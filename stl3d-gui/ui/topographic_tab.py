@@ -7,6 +7,7 @@ import tkinter as tk
 from tkinter import ttk, filedialog
 from resources.styles import COLORS
 from utils.gui_utils import create_button, create_labeled_entry, create_log_area
+from utils.file_utils import IMAGE_FILETYPES, STL_FILETYPES
 from modules.topographic_layering import topographic_layering_process
 
 class TopographicTab:
@@ -117,13 +118,7 @@ class TopographicTab:
     
     def browse_input(self):
         """Öffnet einen Dateiauswahldialog für die Eingabedatei"""
-        filetypes = [
-            ("Bilddateien", "*.jpg *.jpeg *.png *.bmp *.gif *.tiff"),
-            ("JPEG", "*.jpg *.jpeg"),
-            ("PNG", "*.png"),
-            ("Alle Dateien", "*.*")
-        ]
-        filename = filedialog.askopenfilename(filetypes=filetypes)
+        filename = filedialog.askopenfilename(filetypes=IMAGE_FILETYPES)
         if filename:
             self.input_file = filename
             self.input_entry.delete(0, tk.END)
@@ -138,11 +133,7 @@ class TopographicTab:
     
     def browse_output(self):
         """Öffnet einen Dateiauswahldialog für die Ausgabedatei"""
-        filetypes = [
-            ("STL-Dateien", "*.stl"),
-            ("Alle Dateien", "*.*")
-        ]
-        filename = filedialog.asksaveasfilename(defaultextension=".stl", filetypes=filetypes)
+        filename = filedialog.asksaveasfilename(defaultextension=".stl", filetypes=STL_FILETYPES)
         if filename:
             self.output_entry.delete(0, tk.END)
             self.output_entry.insert(0, filename)
@@ -4,8 +4,69 @@ Dateiverwaltungsfunktionen für die STL3D-Anwendung
 
 import os
 import sys
+from pathlib import PurePath
 import tkinter.messagebox as mb
 
+# Dateitypen für die Dateiauswahldialoge der Tabs
+IMAGE_FILETYPES = (
+    ("Bilddateien", "*.jpg *.jpeg *.png *.bmp *.gif *.tiff"),
+    ("JPEG", "*.jpg *.jpeg"),
+    ("PNG", "*.png"),
+    ("Alle Dateien", "*.*")
+)
+STL_FILETYPES = (
+    ("STL-Dateien", "*.stl"),
+    ("Alle Dateien", "*.*")
+)
+
+# Trennzeichen, wenn mehrere ausgewählte Dateien in einem Eingabefeld stehen
+INPUT_FILE_SEPARATOR = "; "
+
+def join_input_files(input_files):
+    """
+    Fasst mehrere ausgewählte Dateien für die Anzeige in einem Eingabefeld zusammen.
+    
+    Args:
+        input_files: Liste der Pfade
+        
+    Returns:
+        Durch INPUT_FILE_SEPARATOR getrennte Pfade
+    """
+    return INPUT_FILE_SEPARATOR.join(input_files)
+
+def split_input_files(input_text, selected_files):
+    """
+    Bestimmt die Eingabedateien aus dem Inhalt eines Eingabefelds.
+    
+    Mehrere im Dateiauswahldialog gewählte Dateien stehen durch
+    INPUT_FILE_SEPARATOR getrennt im Eingabefeld. Wurde das Feld danach
+    geändert (z. B. von Hand oder per Drag & Drop), gilt sein Inhalt als
+    einzelne Datei.
+    
+    Args:
+        input_text: Aktueller Inhalt des Eingabefelds
+        selected_files: Zuletzt im Dateiauswahldialog gewählte Pfade
+        
+    Returns:
+        Liste der Pfade (leer, wenn keine Datei angegeben ist)
+    """
+    if len(selected_files) > 1 and input_text == join_input_files(selected_files):
+        return list(selected_files)
+    return [input_text] if input_text else []
+
+def suggest_output_name(input_file, suffix=""):
+    """
+    Schlägt den Namen der Ausgabe-STL-Datei für eine Eingabedatei vor.
+    
+    Args:
+        input_file: Pfad zur Eingabedatei
+        suffix: Zusatz, der an den Dateinamen ohne Endung angehängt wird
+        
+    Returns:
+        Dateiname der Ausgabedatei
+    """
+    return f"{PurePath(input_file).stem}{suffix}.stl"
+
 def setup_drag_drop(widget, callback):
     """
     Richtet Drag & Drop für die Anwendung ein.
@@ -2,10 +2,22 @@
 Hilfsfunktionen für die GUI-Komponenten der STL3D-Anwendung
 """
 
+import queue
+import threading
 import tkinter as tk
 from tkinter import ttk, scrolledtext
 from resources.styles import COLORS
 
+# Abstand in Millisekunden, in dem Meldungen aus Hintergrund-Threads in die GUI übernommen werden
+QUEUE_POLL_INTERVAL = 100
+
+# Maximale Zeilenzahl eines Log-Felds; darüber bleiben nur die letzten LOG_KEEP_LINES Zeilen stehen
+LOG_MAX_LINES = 2000
+LOG_KEEP_LINES = 1500
+
+# Trennlinie zwischen den Ausgaben zweier Durchläufe im Log-Feld
+LOG_SEPARATOR = "-" * 60
+
 def create_tab(notebook, title):
     """
     Erstellt einen Tab im Notebook mit dem richtigen Stil.
@@ -57,9 +69,11 @@ def create_labeled_entry(parent, label_text, variable, width=None):
     label = ttk.Label(frame, text=label_text)
     label.pack(side=tk.LEFT, padx=(0, 5))
     
-    # Prüfen, ob es sich um eine numerische Variable handelt
+    # Prüfen, ob es sich um eine numerische Variable handelt; IntVar-Felder
+    # nehmen nur Ganzzahlen an, statt Nachkommastellen beim Lesen stillschweigend abzuschneiden
     if isinstance(variable, (tk.IntVar, tk.DoubleVar)):
-        entry = create_numeric_entry(frame, variable, width)
+        entry = create_numeric_entry(frame, variable, width,
+                                     integer=isinstance(variable, tk.IntVar))
     else:
         entry = ttk.Entry(frame, textvariable=variable, width=width)
     
@@ -89,19 +103,156 @@ def create_log_area(parent):
     
     return frame, log_text
 
+def trim_log(text_widget, max_lines=LOG_MAX_LINES, keep_lines=LOG_KEEP_LINES):
+    """
+    Entfernt die ältesten Zeilen eines Log-Felds, wenn es zu lang geworden ist.
+
+    Das Textfeld muss beschreibbar sein (state="normal").
+
+    Args:
+        text_widget: Das Log-Textfeld
+        max_lines: Zeilenzahl, ab der gekürzt wird
+        keep_lines: Anzahl der Zeilen, die nach dem Kürzen stehen bleiben
+    """
+    line_count = int(text_widget.index("end-1c").split(".")[0])
+    if line_count > max_lines:
+        text_widget.delete("1.0", f"{line_count - keep_lines + 1}.0")
+
+def start_log_section(text_widget):
+    """
+    Trennt die Ausgaben eines neuen Durchlaufs im Log-Feld durch eine Linie ab.
+
+    Ersetzt das vollständige Leeren des Log-Felds; die Länge des Logs wird
+    stattdessen durch trim_log() begrenzt.
+
+    Args:
+        text_widget: Das Log-Textfeld
+    """
+    if text_widget.compare("end-1c", "==", "1.0"):
+        return
+
+    text_widget.configure(state="normal")
+    text_widget.insert(tk.END, f"{LOG_SEPARATOR}\n")
+    trim_log(text_widget)
+    text_widget.see(tk.END)
+    text_widget.configure(state="disabled")
+
+def drain_message_queue(message_queue, status_var, text_widget):
+    """
+    Übernimmt die Meldungen von Worker-Threads in Statusleiste und Log-Feld.
+
+    Muss im Tk-Hauptthread aufgerufen werden. Einträge sind Tupel (Art, Meldung):
+    'status' setzt die Statusleiste, 'log' hängt Text an und 'error' erwartet
+    ein Tupel (Fehlermeldung, traceback.TracebackException), das erst hier
+    formatiert wird. Alle Log-Texte werden mit einem einzigen insert() übernommen.
+
+    Args:
+        message_queue: queue.Queue mit den Meldungen
+        status_var: StringVar für die Statusleiste
+        text_widget: Das Log-Textfeld
+    """
+    log_messages = []
+    try:
+        while True:
+            kind, message = message_queue.get_nowait()
+            if kind == 'status':
+                status_var.set(message)
+            elif kind == 'error':
+                error_msg, error_traceback = message
+                log_messages.append(f"{error_msg}\n{''.join(error_traceback.format())}")
+            else:
+                log_messages.append(message)
+    except queue.Empty:
+        pass
+
+    if log_messages:
+        text_widget.configure(state="normal")
+        text_widget.insert(tk.END, "".join(log_messages))
+        trim_log(text_widget)
+        text_widget.see(tk.END)
+        text_widget.configure(state="disabled")
+
+class JobControlMixin:
+    """
+    Abbruch und Abschluss der Aufträge eines Tabs mit Stapelverarbeitung.
+
+    Der Tab muss die Attribute futures (Liste der laufenden Futures),
+    cancel_event (threading.Event), status_var, convert_btn und cancel_btn
+    besitzen. Worker prüfen cancel_event, bevor sie einen Auftrag beginnen.
+    """
+
+    def cancel_jobs(self):
+        """
+        Bricht die Verarbeitung ab.
+
+        Noch wartende Aufträge werden verworfen; ein bereits laufender Auftrag
+        lässt sich nicht unterbrechen und wird noch zu Ende geführt.
+        """
+        self.cancel_event.set()
+        for future in self.futures:
+            future.cancel()
+
+        self.cancel_btn.configure(state="disabled")
+        self.status_var.set("Abbruch angefordert, laufender Auftrag wird noch beendet...")
+
+    def release_finished_jobs(self):
+        """
+        Gibt die Buttons wieder frei, sobald alle Aufträge beendet sind.
+
+        Muss im Tk-Hauptthread aufgerufen werden, z. B. aus _process_queue().
+        """
+        if not self.futures or not all(future.done() for future in self.futures):
+            return
+
+        if self.cancel_event.is_set():
+            skipped = sum(future.cancelled() for future in self.futures)
+            self.status_var.set(f"Verarbeitung abgebrochen: {skipped} von {len(self.futures)} Bildern übersprungen")
+        elif len(self.futures) > 1:
+            self.status_var.set(f"Stapelverarbeitung abgeschlossen: {len(self.futures)} Bilder")
+        self.futures = []
+        self.convert_btn.configure(state="normal")
+        self.cancel_btn.configure(state="disabled")
+
 class RedirectText:
     """Klasse zum Umleiten von stdout in ein Tkinter-Textfeld"""
     
-    def __init__(self, text_widget):
+    def __init__(self, text_widget, interval=QUEUE_POLL_INTERVAL):
+        """
+        Initialisiert die Umleitung.
+
+        Geschriebener Text wird zunächst gesammelt und im Abstand von interval
+        Millisekunden im Tk-Hauptthread mit einem einzigen insert() in das
+        Textfeld übernommen. write() darf daher auch aus Hintergrund-Threads
+        aufgerufen werden.
+
+        Args:
+            text_widget: Das Textfeld für die Ausgabe
+            interval: Abstand zwischen zwei Übernahmen in Millisekunden
+        """
         self.text_widget = text_widget
-        self.buffer = ""
+        self.interval = interval
+        self.pending = []
+        self.lock = threading.Lock()
+        self.text_widget.after(self.interval, self.flush_pending)
         
     def write(self, string):
-        self.buffer += string
-        self.text_widget.configure(state="normal")
-        self.text_widget.insert(tk.END, string)
-        self.text_widget.see(tk.END)
-        self.text_widget.configure(state="disabled")
+        with self.lock:
+            self.pending.append(string)
+
+    def flush_pending(self):
+        """Übernimmt den gesammelten Text in das Textfeld und plant sich erneut ein"""
+        with self.lock:
+            text = "".join(self.pending)
+            self.pending.clear()
+
+        if text:
+            self.text_widget.configure(state="normal")
+            self.text_widget.insert(tk.END, text)
+            trim_log(self.text_widget)
+            self.text_widget.see(tk.END)
+            self.text_widget.configure(state="disabled")
+
+        self.text_widget.after(self.interval, self.flush_pending)
         
     def flush(self):
         pass
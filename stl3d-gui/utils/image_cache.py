@@ -0,0 +1,67 @@
+"""
+Zwischenspeicher für vorverarbeitete Bilddaten der Konvertierungsmodule
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+
+# Maximale Anzahl zwischengespeicherter Bilder
+IMAGE_CACHE_SIZE = 8
+
+# Zuletzt verwendete Einträge stehen am Ende
+IMAGE_CACHE = OrderedDict()
+IMAGE_CACHE_LOCK = threading.Lock()
+
+def image_cache_key(image_path, loader, params):
+    """
+    Bildet den Cache-Schlüssel aus Dateiinhalt, Ladefunktion und Parametern.
+
+    Args:
+        image_path: Pfad zum Bild
+        loader: Funktion, die das Bild lädt und vorverarbeitet
+        params: Tupel der Parameter, mit denen loader aufgerufen wird
+
+    Returns:
+        Hex-String des Hashwerts
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    with open(image_path, 'rb') as f:
+        digest.update(f.read())
+    digest.update(repr((loader.__module__, loader.__qualname__, params)).encode())
+    return digest.hexdigest()
+
+def load_cached_image(image_path, loader, *params):
+    """
+    Lädt ein vorverarbeitetes Bild aus dem Cache oder erzeugt es mit loader.
+
+    Wiederholte Aufrufe mit demselben Bildinhalt und denselben Parametern
+    (z. B. beim Ausprobieren von Mesh-Einstellungen in der GUI) überspringen
+    Laden, Skalieren und Glätten. Das zurückgegebene Array ist schreibgeschützt,
+    da es zwischen Aufrufen geteilt wird.
+
+    Args:
+        image_path: Pfad zum Bild
+        loader: Funktion loader(image_path, *params), die ein NumPy-Array liefert
+        params: Weitere Parameter für loader
+
+    Returns:
+        Schreibgeschütztes NumPy-Array
+    """
+    key = image_cache_key(image_path, loader, params)
+
+    with IMAGE_CACHE_LOCK:
+        if key in IMAGE_CACHE:
+            IMAGE_CACHE.move_to_end(key)
+            return IMAGE_CACHE[key]
+
+    array = loader(image_path, *params)
+    array.flags.writeable = False
+
+    with IMAGE_CACHE_LOCK:
+        IMAGE_CACHE[key] = array
+        IMAGE_CACHE.move_to_end(key)
+        while len(IMAGE_CACHE) > IMAGE_CACHE_SIZE:
+            IMAGE_CACHE.popitem(last=False)
+
+    return array
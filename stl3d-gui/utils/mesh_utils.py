@@ -0,0 +1,114 @@
+"""
+Hilfsfunktionen für den Aufbau von STL-Meshes
+"""
+
+import os
+import mmap
+import numpy as np
+
+# Anzahl der Dreiecke, die pro Block in das Mesh kopiert werden
+FILL_CHUNK_SIZE = 65536
+
+def fill_mesh_vectors(vectors, vertices, faces, chunk_size=FILL_CHUNK_SIZE):
+    """
+    Schreibt die Eckpunkte aller Dreiecke blockweise in das Vektorfeld eines Meshes.
+
+    Statt vertices[faces] für alle Dreiecke auf einmal als temporäres
+    (N, 3, 3)-Array anzulegen, wird immer nur ein Block fester Größe
+    gesammelt. Der Zusatzspeicher bleibt dadurch unabhängig von der Meshgröße.
+
+    Args:
+        vectors: (N, 3, 3)-Zielarray, z. B. mesh.Mesh.vectors
+        vertices: (V, 3)-Array der Eckpunkte
+        faces: (N, 3)-Array der Eckpunktindizes je Dreieck
+        chunk_size: Anzahl der Dreiecke pro Block
+    """
+    for start in range(0, len(faces), chunk_size):
+        end = start + chunk_size
+        vectors[start:end] = vertices[faces[start:end]]
+
+# Datensatz eines Dreiecks im binären STL-Format (50 Bytes)
+STL_RECORD_DTYPE = np.dtype([
+    ('normal', '<f4', (3,)),
+    ('vectors', '<f4', (3, 3)),
+    ('attr', '<u2'),
+])
+
+# 80-Byte-Header; darf nicht mit "solid" beginnen, sonst halten Leser die Datei für ASCII
+STL_HEADER = b"Binary STL created by stl3d".ljust(80, b" ")
+
+def write_binary_stl(path, vertices, faces, chunk_size=FILL_CHUNK_SIZE):
+    """
+    Schreibt ein Dreiecksnetz direkt als binäre STL-Datei.
+
+    Die Datensätze werden blockweise aus Eckpunkten und Indizes aufgebaut und
+    geschrieben, ohne vorher ein mesh.Mesh-Objekt für das gesamte Modell anzulegen.
+
+    Args:
+        path: Pfad der Ausgabedatei
+        vertices: (V, 3)-Array der Eckpunkte
+        faces: (N, 3)-Array der Eckpunktindizes je Dreieck
+        chunk_size: Anzahl der Dreiecke pro Block
+    """
+    vertices = np.asarray(vertices, dtype=np.float32)
+    num_faces = len(faces)
+
+    with open(path, 'wb') as fh:
+        fh.write(STL_HEADER)
+        fh.write(np.uint32(num_faces).tobytes())
+
+        for start in range(0, num_faces, chunk_size):
+            triangles = vertices[faces[start:start + chunk_size]]
+
+            # Einheitsnormalen; entartete Dreiecke erhalten eine Nullnormale
+            normals = np.cross(triangles[:, 1] - triangles[:, 0], triangles[:, 2] - triangles[:, 0])
+            lengths = np.linalg.norm(normals, axis=1, keepdims=True)
+            np.divide(normals, lengths, out=normals, where=lengths > 0)
+
+            records = np.zeros(len(triangles), dtype=STL_RECORD_DTYPE)
+            records['normal'] = normals
+            records['vectors'] = triangles
+            fh.write(records.tobytes())
+
+def read_binary_stl(path):
+    """
+    Liest die Dreiecke einer binären STL-Datei direkt über eine Speicherabbildung.
+
+    Die Datei wird als binär erkannt, wenn ihre Größe genau zu der im Header
+    angegebenen Anzahl von Dreiecken passt. Die Datensätze werden ohne
+    Umweg über ein bytes-Objekt als strukturiertes Array gelesen. Da sie genau
+    einmal von vorne nach hinten durchlaufen werden, wird das Betriebssystem
+    (sofern unterstützt) auf sequentiellen Zugriff hingewiesen und liest
+    entsprechend weiter voraus.
+
+    Args:
+        path: Pfad zur STL-Datei
+
+    Returns:
+        Tupel (vertices, face_normals) mit einem (3N, 3)-Array der Eckpunkte
+        (je drei aufeinanderfolgende bilden ein Dreieck) und einem (N, 3)-Array
+        der gespeicherten Normalen, oder None, wenn keine binäre STL-Datei vorliegt
+    """
+    file_size = os.path.getsize(path)
+    if file_size < 84:
+        return None
+
+    with open(path, 'rb') as fh:
+        fh.seek(80)
+        count = int(np.frombuffer(fh.read(4), dtype='<u4')[0])
+
+        if count == 0 or file_size != 84 + STL_RECORD_DTYPE.itemsize * count:
+            return None
+
+        with mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            if hasattr(mapped, 'madvise') and hasattr(mmap, 'MADV_SEQUENTIAL'):
+                mapped.madvise(mmap.MADV_SEQUENTIAL)
+
+            records = np.frombuffer(mapped, dtype=STL_RECORD_DTYPE, count=count, offset=84)
+            vertices = records['vectors'].reshape(-1, 3).astype(np.float64)
+            face_normals = records['normal'].astype(np.float64)
+
+            # Die Abbildung lässt sich erst schließen, wenn keine Sicht mehr auf sie verweist
+            del records
+
+    return vertices, face_normals
@@ -0,0 +1,116 @@
+"""
+Zwischenspeicher für fertige STL-Dateien der Konvertierungsmodule
+"""
+
+import os
+import glob
+import shutil
+import hashlib
+
+# Verzeichnis, in dem die Ergebnisse dauerhaft abgelegt werden
+RESULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "stl3d")
+
+# Maximale Anzahl zwischengespeicherter STL-Dateien
+RESULT_CACHE_SIZE = 32
+
+# Bei Änderungen am Format der Ergebnisse erhöhen, um alle alten Einträge zu verwerfen
+RESULT_CACHE_VERSION = 1
+
+# Paketverzeichnisse, deren Quelltext die Ergebnisse beeinflusst (modules/ und utils/)
+SOURCE_DIRS = tuple(
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), package)
+    for package in ("modules", "utils")
+)
+
+def source_mtime():
+    """
+    Bestimmt die jüngste Änderungszeit aller Quelldateien der Verarbeitung.
+
+    Neben der eigentlichen Verarbeitungsfunktion fließen auch Hilfsfunktionen
+    (z. B. utils/mesh_utils.py oder utils/image_cache.py) in die Ergebnisse ein;
+    jede Änderung an einer dieser Dateien macht den Cache daher ungültig.
+
+    Returns:
+        Änderungszeit in Nanosekunden (0, wenn keine Datei gefunden wurde)
+    """
+    mtimes = [os.stat(path).st_mtime_ns
+              for source_dir in SOURCE_DIRS
+              for path in glob.glob(os.path.join(source_dir, "*.py"))]
+    return max(mtimes, default=0)
+
+def result_cache_path(input_file, process, params):
+    """
+    Bestimmt den Cache-Pfad für das Ergebnis einer Konvertierung.
+
+    Der Schlüssel setzt sich aus Pfad, Änderungszeit und Größe der Eingabedatei,
+    der Verarbeitungsfunktion, der Cache-Version, der jüngsten Änderungszeit der
+    Quelldateien in modules/ und utils/ sowie den Parametern zusammen. Parameter, die nur den Namen der Ausgabedatei
+    beeinflussen, dürfen nicht in params enthalten sein.
+
+    Args:
+        input_file: Pfad zur Eingabedatei
+        process: Verarbeitungsfunktion, die das Ergebnis erzeugt
+        params: Dictionary der Parameter, die das Ergebnis beeinflussen
+
+    Returns:
+        Pfad der STL-Datei im Cache-Verzeichnis (muss nicht existieren)
+    """
+    stat = os.stat(input_file)
+    key = (RESULT_CACHE_VERSION, os.path.abspath(input_file), stat.st_mtime_ns, stat.st_size,
+           process.__module__, process.__qualname__, source_mtime(), sorted(params.items()))
+    digest = hashlib.blake2b(repr(key).encode(), digest_size=16).hexdigest()
+    return os.path.join(RESULT_CACHE_DIR, f"{digest}.stl")
+
+def load_cached_result(cache_path, output_path):
+    """
+    Kopiert ein zwischengespeichertes Ergebnis an den Ausgabepfad.
+
+    Bei einem Treffer wird dies im Log vermerkt, da die Verarbeitungsfunktion
+    nicht läuft und ihre Nebenausgaben (z. B. Vorschaubilder) nicht entstehen.
+
+    Args:
+        cache_path: Pfad aus result_cache_path()
+        output_path: Ziel der STL-Datei
+
+    Returns:
+        True, wenn das Ergebnis aus dem Cache übernommen wurde, sonst False
+    """
+    if not os.path.exists(cache_path):
+        return False
+
+    try:
+        shutil.copyfile(cache_path, output_path)
+    except OSError:
+        return False
+
+    # Zuletzt verwendete Einträge werden beim Aufräumen zuletzt entfernt
+    os.utime(cache_path)
+    print(f"Eingabe und Parameter unverändert, Ergebnis aus dem Cache übernommen: {cache_path}")
+    return True
+
+def store_result(result_path, cache_path):
+    """
+    Legt eine erzeugte STL-Datei im Cache ab und entfernt die ältesten Einträge.
+
+    Fehler beim Schreiben werden ignoriert, da der Cache nur der Beschleunigung dient.
+
+    Args:
+        result_path: Pfad der erzeugten STL-Datei
+        cache_path: Pfad aus result_cache_path()
+    """
+    if not result_path or not os.path.exists(result_path):
+        return
+
+    try:
+        os.makedirs(RESULT_CACHE_DIR, exist_ok=True)
+
+        # Erst vollständig kopieren, dann umbenennen, damit nie halbe Dateien im Cache liegen
+        temp_path = f"{cache_path}.{os.getpid()}.tmp"
+        shutil.copyfile(result_path, temp_path)
+        os.replace(temp_path, cache_path)
+
+        entries = sorted(glob.glob(os.path.join(RESULT_CACHE_DIR, "*.stl")), key=os.path.getmtime)
+        for entry in entries[:-RESULT_CACHE_SIZE]:
+            os.remove(entry)
+    except OSError as e:
+        print(f"Hinweis: Ergebnis konnte nicht zwischengespeichert werden: {e}")
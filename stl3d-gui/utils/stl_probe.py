@@ -0,0 +1,46 @@
+"""
+Schnelle Vorprüfung von STL-Dateien anhand ihres Dateianfangs
+"""
+
+import os
+import struct
+from typing import Optional
+from utils.mesh_utils import STL_RECORD_DTYPE
+
+# Anzahl der Bytes, in denen bei ASCII-STL-Dateien das erste "facet" stehen muss
+ASCII_PROBE_SIZE = 1024
+
+def probe_stl(path) -> Optional[int]:
+    """
+    Prüft, ob eine Datei dem Aufbau nach eine STL-Datei ist, ohne sie einzulesen.
+
+    Eine binäre STL-Datei wird daran erkannt, dass ihre Größe genau zur
+    Dreiecksanzahl im Header passt. Andernfalls muss die Datei mit "solid"
+    beginnen und kurz danach ein "facet" enthalten (ASCII-STL); das erste
+    Kriterium allein genügt nicht, da auch viele binäre Header mit "solid" beginnen.
+
+    Args:
+        path: Pfad zur Datei
+
+    Returns:
+        Anzahl der Dreiecke bei binären Dateien, 0 bei ASCII-Dateien (die Anzahl
+        ist erst nach dem Einlesen bekannt) oder None, wenn die Datei nicht
+        lesbar ist, leer ist oder keine STL-Datei ist
+    """
+    try:
+        file_size = os.path.getsize(path)
+        with open(path, 'rb') as fh:
+            head = fh.read(max(84, ASCII_PROBE_SIZE))
+    except OSError:
+        return None
+
+    if len(head) >= 84:
+        count = struct.unpack("<I", head[80:84])[0]
+        if count > 0 and file_size == 84 + STL_RECORD_DTYPE.itemsize * count:
+            return count
+
+    text = head[:ASCII_PROBE_SIZE].lstrip()
+    if text.startswith(b"solid") and b"facet" in text:
+        return 0
+
+    return None
@@ -22,18 +22,32 @@ def validate_numeric(value):
     pattern = r'^[-+]?[0-9]*\.?[0-9]+$'
     return bool(re.match(pattern, value))
 
-def register_numeric_validation(entry_widget):
+def validate_integer(value):
+    """
+    Überprüft, ob ein Wert eine gültige Ganzzahl ist oder gerade zu einer wird.
+    
+    Args:
+        value: Der zu überprüfende Wert
+        
+    Returns:
+        True, wenn der Wert leer, ein einzelnes Vorzeichen oder eine Ganzzahl ist
+    """
+    return bool(re.match(r'^[-+]?[0-9]*$', value))
+
+def register_numeric_validation(entry_widget, integer=False):
     """
     Registriert eine Validierungsfunktion für ein Eingabefeld,
     die nur numerische Eingaben zulässt.
     
     Args:
         entry_widget: Das Tkinter-Entry-Widget
+        integer: Wenn True, werden nur Ganzzahlen zugelassen
     """
-    vcmd = (entry_widget.register(validate_numeric), '%P')
+    validator = validate_integer if integer else validate_numeric
+    vcmd = (entry_widget.register(validator), '%P')
     entry_widget.configure(validate="key", validatecommand=vcmd)
 
-def create_numeric_entry(parent, textvariable, width=None):
+def create_numeric_entry(parent, textvariable, width=None, integer=False):
     """
     Erstellt ein Eingabefeld, das nur numerische Eingaben akzeptiert.
     
@@ -41,10 +55,11 @@ def create_numeric_entry(parent, textvariable, width=None):
         parent: Das übergeordnete Widget
         textvariable: Tkinter-Variable für den Wert
         width: Breite des Eingabefelds
+        integer: Wenn True, werden nur Ganzzahlen zugelassen
         
     Returns:
         Das erstellte Entry-Widget
     """
     entry = tk.Entry(parent, textvariable=textvariable, width=width)
-    register_numeric_validation(entry)
+    register_numeric_validation(entry, integer)
     return entry